@@ -6,6 +6,7 @@ from alembic import context
 
 # импорт моделей, чтобы они были доступны для автогенерации
 from app.database.db import Base
+import app.models  # noqa: F401
 
 # this is the Alembic Config object
 config = context.config
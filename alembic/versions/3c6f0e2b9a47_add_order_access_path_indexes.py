@@ -0,0 +1,55 @@
+"""Add order access path indexes
+
+Revision ID: 3c6f0e2b9a47
+Revises: bf167e67981d
+Create Date: 2026-10-18 11:03:27.114502
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c6f0e2b9a47"
+down_revision: Union[str, None] = "bf167e67981d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY не блокирует запись, но не работает в транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_orders_user_id_created_at_id",
+            "orders",
+            ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_orders_active_status_created_at",
+            "orders",
+            ["status", "created_at"],
+            unique=False,
+            postgresql_where=sa.text("status IN ('PENDING', 'PAID')"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_orders_active_status_created_at",
+            table_name="orders",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_orders_user_id_created_at_id",
+            table_name="orders",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,41 @@
+"""Add user order stats
+
+Revision ID: 5e7b9c3d1a28
+Revises: 8d2a4c61f0b3
+Create Date: 2026-10-18 18:20:43.117352
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e7b9c3d1a28"
+down_revision: Union[str, None] = "8d2a4c61f0b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "user_order_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("orders_count", sa.Integer(), nullable=False),
+        sa.Column("pending_count", sa.Integer(), nullable=False),
+        sa.Column("paid_count", sa.Integer(), nullable=False),
+        sa.Column("shipped_count", sa.Integer(), nullable=False),
+        sa.Column("canceled_count", sa.Integer(), nullable=False),
+        sa.Column("total_spent", sa.Float(), nullable=False),
+        sa.Column("last_order_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("user_order_stats")
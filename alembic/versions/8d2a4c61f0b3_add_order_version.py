@@ -0,0 +1,32 @@
+"""Add order version
+
+Revision ID: 8d2a4c61f0b3
+Revises: 3c6f0e2b9a47
+Create Date: 2026-10-18 12:21:09.640137
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d2a4c61f0b3"
+down_revision: Union[str, None] = "3c6f0e2b9a47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "orders",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("orders", "version")
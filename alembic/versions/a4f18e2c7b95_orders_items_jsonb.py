@@ -0,0 +1,61 @@
+"""Orders items JSONB
+
+Revision ID: a4f18e2c7b95
+Revises: 5e7b9c3d1a28
+Create Date: 2026-10-18 18:41:06.250981
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4f18e2c7b95"
+down_revision: Union[str, None] = "5e7b9c3d1a28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Смена типа переписывает таблицу под ACCESS EXCLUSIVE блокировкой
+    op.alter_column(
+        "orders",
+        "items",
+        existing_type=sa.JSON(),
+        type_=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using="items::jsonb",
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_orders_items_gin",
+            "orders",
+            ["items"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"items": "jsonb_path_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_orders_items_gin",
+            table_name="orders",
+            postgresql_concurrently=True,
+        )
+    op.alter_column(
+        "orders",
+        "items",
+        existing_type=postgresql.JSONB(),
+        type_=sa.JSON(),
+        existing_nullable=False,
+        postgresql_using="items::json",
+    )
@@ -0,0 +1,164 @@
+"""Partition orders by month
+
+Revision ID: d3b6a91f4c27
+Revises: a4f18e2c7b95
+Create Date: 2026-10-18 19:02:37.480512
+
+"""
+
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d3b6a91f4c27"
+down_revision: Union[str, None] = "a4f18e2c7b95"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Партиции, создаваемые сразу после границы orders_legacy; дальше их
+# поддерживает задача maintain_order_partitions
+PREMAKE_MONTHS = 3
+
+LEGACY_INDEXES = {
+    "ix_orders_user_id_created_at_id": "orders_legacy_user_id_created_at_id_idx",
+    "ix_orders_active_status_created_at": "orders_legacy_active_status_created_at_idx",
+    "ix_orders_items_gin": "orders_legacy_items_gin_idx",
+}
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _create_order_indexes() -> None:
+    op.create_index(
+        "ix_orders_user_id_created_at_id",
+        "orders",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_orders_active_status_created_at",
+        "orders",
+        ["status", "created_at"],
+        unique=False,
+        postgresql_where=sa.text("status IN ('PENDING', 'PAID')"),
+    )
+    op.create_index(
+        "ix_orders_items_gin",
+        "orders",
+        ["items"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"items": "jsonb_path_ops"},
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Существующая таблица становится партицией orders_legacy: граница -
+    # начало месяца после следующего, с запасом, чтобы новые заказы
+    # не вышли за нее, пока идет миграция
+    this_month = datetime.utcnow().replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    boundary = _add_months(this_month, 2)
+
+    # Подготовка без блокировки записи: уникальный индекс под первичный
+    # ключ (id, created_at) и проверенный CHECK, с которым ATTACH PARTITION
+    # не сканирует таблицу. Остатки прерванного запуска удаляются: индекс
+    # CONCURRENTLY после сбоя остается невалидным
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "orders_legacy_id_created_at_key",
+            table_name="orders",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.execute(
+            "ALTER TABLE orders DROP CONSTRAINT IF EXISTS orders_legacy_created_at_check"
+        )
+        op.create_index(
+            "orders_legacy_id_created_at_key",
+            "orders",
+            ["id", "created_at"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.execute(
+            "ALTER TABLE orders ADD CONSTRAINT orders_legacy_created_at_check "
+            f"CHECK (created_at < '{boundary:%Y-%m-%d}') NOT VALID"
+        )
+        op.execute(
+            "ALTER TABLE orders VALIDATE CONSTRAINT orders_legacy_created_at_check"
+        )
+
+    # Подмена таблицы: только изменения каталога, под короткой блокировкой
+    op.execute("SET LOCAL lock_timeout = '10s'")
+    op.rename_table("orders", "orders_legacy")
+    # Первичный ключ партиции должен совпадать с ключом orders: ключ по id
+    # заменяется готовым уникальным индексом, индекс при этом переименуется
+    # в orders_legacy_pkey
+    op.execute("ALTER TABLE orders_legacy DROP CONSTRAINT orders_pkey")
+    op.execute(
+        "ALTER TABLE orders_legacy ADD CONSTRAINT orders_legacy_pkey "
+        "PRIMARY KEY USING INDEX orders_legacy_id_created_at_key"
+    )
+    for index, legacy_index in LEGACY_INDEXES.items():
+        op.execute(f"ALTER INDEX {index} RENAME TO {legacy_index}")
+
+    op.create_table(
+        "orders",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("items", postgresql.JSONB(), nullable=False),
+        sa.Column("total_price", sa.Float(), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="orderstatus", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="orders_user_id_fkey"),
+        sa.PrimaryKeyConstraint("id", "created_at", name="orders_pkey"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    # У партиционированной таблицы еще нет партиций, индексы создаются сразу;
+    # при ATTACH к ним подключаются совпадающие индексы orders_legacy
+    _create_order_indexes()
+    op.execute(
+        "ALTER TABLE orders ATTACH PARTITION orders_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary:%Y-%m-%d}')"
+    )
+    op.execute(
+        "ALTER TABLE orders_legacy DROP CONSTRAINT orders_legacy_created_at_check"
+    )
+
+    for offset in range(PREMAKE_MONTHS):
+        start = _add_months(boundary, offset)
+        end = _add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE orders_p{start:%Y_%m} PARTITION OF orders "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Заказы из архивированных партиций не возвращаются
+    op.execute("CREATE TABLE orders_plain (LIKE orders INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO orders_plain SELECT * FROM orders")
+    op.drop_table("orders")
+    op.rename_table("orders_plain", "orders")
+    op.create_primary_key("orders_pkey", "orders", ["id"])
+    op.create_foreign_key(
+        "orders_user_id_fkey", "orders", "users", ["user_id"], ["id"]
+    )
+    _create_order_indexes()
@@ -1,7 +1,9 @@
 """
 Authentication module - API для аутентификации и JWT токенов.
 """
+import hashlib
 import os
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Annotated, Dict
 
@@ -9,13 +11,17 @@ import jwt
 from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi_limiter.depends import RateLimiter
-from passlib.context import CryptContext
+import redis.asyncio as redis
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.auth.hashing import password_hasher
+from app.core.config import settings
 from app.database.db_depends import get_db
 from app.models.users import Users
+from app.services.local_cache import LocalCache
+from app.services.rate_limiter import RateLimiter
+from app.services.redis_service import get_redis
 
 load_dotenv()
 
@@ -24,13 +30,24 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 ALGORITHM = "HS256"
 
 router = APIRouter(prefix="/token", tags=["authentication"])
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Проверенные токены: sha256(token) -> _VerifiedToken, хранятся до exp
+token_cache = LocalCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_DEFAULT_TTL)
+
+
+class _VerifiedToken:
+   __slots__ = ("user", "expires_at", "revocation_checked_at")
+
+   def __init__(self, user: Dict, expires_at: float):
+       self.user = user
+       self.expires_at = expires_at
+       self.revocation_checked_at = 0.0
 
 
 async def authenticate_user(db: AsyncSession, email: str, password: str):
    """Аутентифицирует пользователя по email и паролю"""
    user = await db.scalar(select(Users).where(Users.email == email))
-   if not user or not bcrypt_context.verify(password, user.password):
+   if not user or not await password_hasher.verify(password, user.password):
        raise HTTPException(
            status_code=status.HTTP_401_UNAUTHORIZED,
            detail="Invalid authentication credentials",
@@ -47,17 +64,69 @@ def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes
    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
-   """Извлекает пользователя из JWT токена"""
+def _token_digest(token: str) -> bytes:
+   return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def _revocation_key(digest: bytes) -> str:
+   return f"auth:revoked:{digest.hex()}"
+
+
+def _verify_token(token: str) -> _VerifiedToken:
    try:
        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-       email = payload.get("sub")
-       user_id = payload.get("id")
-       if email is None or user_id is None:
-           raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-       return {"email": email, "id": user_id}
    except jwt.PyJWTError:
        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+   email = payload.get("sub")
+   user_id = payload.get("id")
+   if email is None or user_id is None:
+       raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+   expires_at = payload.get("exp", time.time() + settings.TOKEN_CACHE_DEFAULT_TTL)
+   return _VerifiedToken({"email": email, "id": user_id}, expires_at)
+
+
+def _authenticate(token: str) -> _VerifiedToken:
+   """
+   Проверенные токены кэшируются до истечения exp, поэтому повторные
+   запросы с тем же токеном не декодируют JWT заново.
+   """
+   digest = _token_digest(token)
+   verified = token_cache.get(digest)
+   if verified is None:
+       verified = _verify_token(token)
+       token_cache.set(digest, verified, ttl=verified.expires_at - time.time())
+   elif verified.expires_at <= time.time():
+       token_cache.invalidate(digest)
+       raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+   return verified
+
+
+async def _get_user(token: Annotated[str, Depends(oauth2_scheme)]):
+   """Извлекает пользователя из JWT токена"""
+   return dict(_authenticate(token).user)
+
+
+async def _get_user_not_revoked(
+   token: Annotated[str, Depends(oauth2_scheme)],
+   redis_client: Annotated[redis.Redis, Depends(get_redis)],
+):
+   """Извлекает пользователя из JWT токена и проверяет, что токен не отозван"""
+   verified = _authenticate(token)
+   now = time.monotonic()
+   checked_ago = now - verified.revocation_checked_at
+   if checked_ago >= settings.TOKEN_REVOCATION_CHECK_INTERVAL:
+       digest = _token_digest(token)
+       if await redis_client.exists(_revocation_key(digest)):
+           token_cache.invalidate(digest)
+           raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+       verified.revocation_checked_at = now
+   return dict(verified.user)
+
+
+# Без отзыва токенов проверка пользователя не обращается к Redis
+get_current_user = (
+   _get_user_not_revoked if settings.TOKEN_REVOCATION_ENABLED else _get_user
+)
 
 
 @router.post(
@@ -90,4 +159,31 @@ async def read_users_me(
    request: Request, current_user: Annotated[dict, Depends(get_current_user)]
 ):
    """Возвращает данные текущего пользователя"""
-   return current_user
\ No newline at end of file
+   return current_user
+
+
+@router.post(
+   "/revoke",
+   status_code=status.HTTP_200_OK,
+   dependencies=[Depends(RateLimiter(times=5, seconds=60))],
+   summary="Отзыв JWT токена"
+)
+async def revoke_token(
+   request: Request,
+   token: Annotated[str, Depends(oauth2_scheme)],
+   redis_client: Annotated[redis.Redis, Depends(get_redis)],
+   current_user: Annotated[dict, Depends(get_current_user)],
+) -> Dict[str, str]:
+   """Добавляет текущий токен в список отозванных до истечения его срока"""
+   if not settings.TOKEN_REVOCATION_ENABLED:
+       # Отозванный токен никто бы не проверял
+       raise HTTPException(
+           status_code=status.HTTP_404_NOT_FOUND,
+           detail="Token revocation is disabled",
+       )
+   digest = _token_digest(token)
+   verified = token_cache.get(digest)
+   ttl = int(verified.expires_at - time.time()) + 1 if verified else 1
+   await redis_client.set(_revocation_key(digest), 1, ex=max(ttl, 1))
+   token_cache.invalidate(digest)
+   return {"detail": "Token revoked"}
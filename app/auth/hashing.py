@@ -0,0 +1,91 @@
+"""
+Password hashing module - хэширование паролей в отдельном пуле потоков.
+
+bcrypt намеренно медленный, поэтому вызовы выносятся из event loop
+в ограниченный пул. Если в очереди слишком много вызовов, новые
+отклоняются с 503, а не копятся и не увеличивают задержку остальных.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordHasher:
+    def __init__(self, max_workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hasher"
+        )
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(bcrypt_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(bcrypt_context.verify, password, hashed_password)
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self._max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent authentication requests",
+                headers={"Retry-After": "1"},
+            )
+
+        queued_at = time.perf_counter()
+
+        def timed() -> Any:
+            started_at = time.perf_counter()
+            result = func(*args)
+            return result, started_at - queued_at, time.perf_counter() - started_at
+
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        try:
+            result, wait_seconds, run_seconds = await loop.run_in_executor(
+                self._executor, timed
+            )
+        finally:
+            self._pending -= 1
+
+        self.completed += 1
+        self.total_wait_seconds += wait_seconds
+        self.total_run_seconds += run_seconds
+        self.max_run_seconds = max(self.max_run_seconds, run_seconds)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        completed = self.completed or 1
+        return {
+            "workers": self._max_workers,
+            "max_pending": self._max_pending,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.total_wait_seconds / completed * 1000,
+            "avg_run_ms": self.total_run_seconds / completed * 1000,
+            "max_run_ms": self.max_run_seconds * 1000,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING
+)
@@ -4,18 +4,17 @@ Registration module - API для регистрации новых пользо
 from typing import Annotated, Dict
 
 from fastapi import APIRouter, Depends, Request, status
-from fastapi_limiter.depends import RateLimiter
-from passlib.context import CryptContext
 from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.auth.hashing import password_hasher
 from app.database.db_depends import get_db
 from app.models.users import Users
 from app.schemas import CreateUser
+from app.services.rate_limiter import RateLimiter
 
 
 router = APIRouter(prefix="/register", tags=["authentication"])
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 @router.post(
@@ -32,13 +31,14 @@ async def create_user(
     """
     Регистрирует нового пользователя в системе.
     
-    Хэширует пароль пользователя перед сохранением в базу данных.
+    Хэширует пароль пользователя в отдельном пуле потоков
+    перед сохранением в базу данных.
     Ограничивает создание аккаунтов до 5 запросов в минуту.
     """
     await db.execute(
         insert(Users).values(
             email=create_user.email,
-            password=bcrypt_context.hash(create_user.password),
+            password=await password_hasher.hash(create_user.password),
         )
     )
     await db.commit()
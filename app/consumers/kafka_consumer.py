@@ -0,0 +1,190 @@
+"""
+Kafka consumer module - пакетный потребитель событий заказов.
+
+Сообщения забираются пачками через getmany(), каждая партиция обрабатывается
+своим воркером по порядку, а общее число одновременных обработчиков
+ограничено семафором. Оффсеты коммитятся вручную после обработки пачки.
+Если у партиции накопилось max_pending_batches необработанных пачек,
+она ставится на паузу и возобновляется, когда обработчик ее догонит.
+
+Запуск: python -m app.consumers.kafka_consumer
+"""
+import asyncio
+import signal
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from aiokafka import AIOKafkaConsumer, ConsumerRecord, TopicPartition
+from aiokafka.abc import ConsumerRebalanceListener
+from aiokafka.errors import CommitFailedError
+from loguru import logger
+
+from app.core.config import settings
+from app.services import codec
+
+Handler = Callable[[TopicPartition, List[ConsumerRecord]], Awaitable[None]]
+
+
+class BatchConsumer:
+    def __init__(
+        self,
+        consumer,
+        handler: Handler,
+        max_records: int = settings.KAFKA_CONSUMER_MAX_RECORDS,
+        timeout_ms: int = settings.KAFKA_CONSUMER_TIMEOUT_MS,
+        concurrency: int = settings.KAFKA_CONSUMER_CONCURRENCY,
+        max_pending_batches: int = settings.KAFKA_CONSUMER_MAX_PENDING_BATCHES,
+        max_retries: int = settings.KAFKA_CONSUMER_MAX_RETRIES,
+    ):
+        self._consumer = consumer
+        self._handler = handler
+        self._max_records = max_records
+        self._timeout_ms = timeout_ms
+        self._max_pending_batches = max_pending_batches
+        self._max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._queues: Dict[TopicPartition, asyncio.Queue] = {}
+        self._workers: Dict[TopicPartition, asyncio.Task] = {}
+        # Оффсеты обработанных, но еще не закоммиченных пачек
+        self._offsets: Dict[TopicPartition, int] = {}
+        self._stopping = asyncio.Event()
+        self._error: Optional[BaseException] = None
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Читает и обрабатывает сообщения до вызова stop() или ошибки обработчика"""
+        try:
+            while not self._stopping.is_set():
+                batches = await self._consumer.getmany(
+                    timeout_ms=self._timeout_ms, max_records=self._max_records
+                )
+                for tp, records in batches.items():
+                    if records:
+                        await self._dispatch(tp, records)
+                await self.commit()
+        finally:
+            await self._release(list(self._workers))
+        if self._error is not None:
+            raise self._error
+
+    async def commit(self) -> None:
+        if not self._offsets:
+            return
+        offsets, self._offsets = self._offsets, {}
+        try:
+            await self._consumer.commit(offsets)
+        except CommitFailedError as e:
+            # Партиции уже переназначены, пачки будут прочитаны повторно
+            logger.warning(f"Kafka offset commit failed: {e}")
+
+    async def on_partitions_revoked(self, revoked) -> None:
+        """Дообрабатывает и коммитит отзываемые партиции перед ребалансировкой"""
+        await self._release([tp for tp in revoked if tp in self._workers])
+
+    async def _dispatch(
+        self, tp: TopicPartition, records: List[ConsumerRecord]
+    ) -> None:
+        queue = self._queues.get(tp)
+        if queue is None:
+            queue = self._queues[tp] = asyncio.Queue(self._max_pending_batches)
+            self._workers[tp] = asyncio.create_task(self._work(tp, queue))
+        await queue.put(records)
+        if queue.full():
+            self._consumer.pause(tp)
+
+    async def _work(self, tp: TopicPartition, queue: asyncio.Queue) -> None:
+        while True:
+            records = await queue.get()
+            try:
+                await self._handle(tp, records)
+                self._offsets[tp] = records[-1].offset + 1
+            except Exception as e:
+                logger.error(f"Failed to process batch from {tp}: {e}")
+                self._error = e
+                self._stopping.set()
+                # Освобождаем очередь, чтобы не блокировать цикл чтения;
+                # незакоммиченные пачки будут прочитаны после перезапуска
+                while not queue.empty():
+                    queue.get_nowait()
+                    queue.task_done()
+                return
+            finally:
+                queue.task_done()
+            if tp in self._consumer.paused() and not queue.full():
+                self._consumer.resume(tp)
+
+    async def _handle(self, tp: TopicPartition, records: List[ConsumerRecord]) -> None:
+        delay = 0.1
+        for attempt in range(self._max_retries + 1):
+            try:
+                async with self._semaphore:
+                    await self._handler(tp, records)
+                return
+            except Exception as e:
+                if attempt == self._max_retries:
+                    raise
+                logger.warning(f"Retrying batch from {tp} after error: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+
+    async def _release(self, partitions: List[TopicPartition]) -> None:
+        alive = [tp for tp in partitions if not self._workers[tp].done()]
+        if self._error is None:
+            await asyncio.gather(*(self._queues[tp].join() for tp in alive))
+        for tp in partitions:
+            self._workers.pop(tp).cancel()
+            self._queues.pop(tp)
+        await self.commit()
+
+
+class _RebalanceListener(ConsumerRebalanceListener):
+    def __init__(self, batch_consumer: BatchConsumer):
+        self._batch_consumer = batch_consumer
+
+    async def on_partitions_revoked(self, revoked) -> None:
+        await self._batch_consumer.on_partitions_revoked(revoked)
+
+    async def on_partitions_assigned(self, assigned) -> None:
+        pass
+
+
+async def handle_new_orders(tp: TopicPartition, records: List[ConsumerRecord]) -> None:
+    """
+    Разбирает события new_orders и пишет их число в лог.
+
+    Намеренная заглушка: сводка, кэш и автооплата обновляются при записи
+    заказа, своего потребителя у new_orders в этом репозитории нет.
+    Обработку для внешней системы подключают здесь или передают
+    свой обработчик в BatchConsumer.
+    """
+    events = [codec.loads(record.value) for record in records]
+    logger.info(
+        f"Consumed {len(events)} new_orders events from partition {tp.partition}"
+    )
+
+
+async def main() -> None:
+    consumer = AIOKafkaConsumer(
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+        group_id=settings.KAFKA_CONSUMER_GROUP,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        max_poll_records=settings.KAFKA_CONSUMER_MAX_RECORDS,
+    )
+    batch_consumer = BatchConsumer(consumer, handle_new_orders)
+    consumer.subscribe(["new_orders"], listener=_RebalanceListener(batch_consumer))
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, batch_consumer.stop)
+
+    await consumer.start()
+    try:
+        await batch_consumer.run()
+    finally:
+        await consumer.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
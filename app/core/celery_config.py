@@ -0,0 +1,26 @@
+from app.core.config import settings
+
+broker_url = settings.CELERY_BROKER_URL
+result_backend = settings.CELERY_RESULT_BACKEND
+
+# Настройка логирования
+task_track_started = True
+task_send_sent_event = True
+
+# Результаты задач обработки никто не читает, не пишем их в Redis
+task_ignore_result = True
+# Задача подтверждается после выполнения: при падении воркера она вернется в очередь
+task_acks_late = True
+worker_prefetch_multiplier = 4
+
+beat_schedule = {
+    "maintain-order-partitions": {
+        "task": "app.tasks.order_task.maintain_order_partitions",
+        "schedule": settings.ORDERS_PARTITION_MAINTENANCE_INTERVAL,
+    },
+}
+if settings.ORDER_AUTO_PAY_ENABLED:
+    beat_schedule["sweep-pending-orders"] = {
+        "task": "app.tasks.order_task.sweep_pending_orders",
+        "schedule": settings.ORDER_PROCESSING_SWEEP_INTERVAL,
+    }
@@ -1,11 +1,95 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
+    # Если не задан, URL собирается из переменных POSTGRES_*_local
+    DATABASE_URL: Optional[str] = None
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500
+    # URL реплик для чтения через запятую; пусто - все читается с primary
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_HEALTH_INTERVAL: float = 5.0
+    DB_REPLICA_MAX_LAG: float = 10.0
+    DB_REPLICA_HEALTH_TIMEOUT: float = 2.0
+    # Сколько секунд после записи пользователя его чтения идут в primary; 0 - выкл.
+    READ_YOUR_WRITES_WINDOW: float = 0.0
+    READ_YOUR_WRITES_CACHE_SIZE: int = 50_000
     REDIS_URL: str = "redis://redis:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2.0
     KAFKA_BOOTSTRAP_SERVERS: str = "kafka:9092"
+    KAFKA_LINGER_MS: int = 5
+    KAFKA_MAX_BATCH_SIZE: int = 64 * 1024
+    KAFKA_COMPRESSION_TYPE: Optional[str] = "lz4"
+    KAFKA_ACKS: str = "all"
+    KAFKA_CONSUMER_GROUP: str = "order-consumers"
+    KAFKA_CONSUMER_MAX_RECORDS: int = 500
+    KAFKA_CONSUMER_TIMEOUT_MS: int = 1000
+    KAFKA_CONSUMER_CONCURRENCY: int = 8
+    KAFKA_CONSUMER_MAX_PENDING_BATCHES: int = 4
+    KAFKA_CONSUMER_MAX_RETRIES: int = 3
+    OUTBOX_RELAY_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL: float = 0.5
+    RATE_LIMIT_PREFIX: str = "rl"
+    RATE_LIMIT_LOCAL_SHARE: float = 0.2
+    RATE_LIMIT_SYNC_INTERVAL: float = 1.0
+    TOKEN_CACHE_SIZE: int = 50_000
+    TOKEN_CACHE_DEFAULT_TTL: float = 300.0
+    TOKEN_REVOCATION_ENABLED: bool = False
+    TOKEN_REVOCATION_CHECK_INTERVAL: float = 5.0
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    ORDERS_BATCH_MAX_SIZE: int = 1000
+    ORDERS_BATCH_TASK_CHUNK: int = 100
+    # id передаются в строке запроса: 200 UUID укладываются в ~8 КБ
+    ORDERS_BATCH_GET_MAX_IDS: int = 200
+    ORDERS_PAGE_MAX_LIMIT: int = 500
+    ORDERS_STREAM_CHUNK_SIZE: int = 1000
+    # Объединение одновременных create_order в один INSERT и один коммит
+    ORDERS_COALESCE_ENABLED: bool = False
+    ORDERS_COALESCE_WINDOW_MS: float = 5.0
+    ORDERS_COALESCE_MAX_BATCH: int = 200
+    # Повторы POST /orders/ с заголовком Idempotency-Key
+    IDEMPOTENCY_TTL: int = 86400
+    IDEMPOTENCY_LOCK_TTL_MS: int = 30_000
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 10.0
+    # Месячные партиции orders и архивация старых, см. app.database.partitions
+    ORDERS_PARTITION_PREMAKE_MONTHS: int = 3
+    ORDERS_PARTITION_MAINTENANCE_INTERVAL: float = 3600.0
+    ORDERS_ARCHIVE_AFTER_MONTHS: int = 12
+    ORDERS_ARCHIVE_DIR: str = "/var/lib/orders-archive"
+    ORDER_CACHE_TTL: int = 300
+    ORDER_CACHE_CHANNEL: str = "orders:invalidate"
+    ORDER_L1_CACHE_SIZE: int = 10_000
+    ORDER_L1_CACHE_TTL: float = 5.0
+    ORDER_CACHE_DISTRIBUTED_LOCK: bool = False
+    ORDER_CACHE_LOCK_TTL_MS: int = 2000
+    ORDER_CACHE_LOCK_WAIT: float = 1.0
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
+    CELERY_DB_POOL_SIZE: int = 10
+    CELERY_DB_MAX_OVERFLOW: int = 5
+    ORDER_PROCESSING_BATCH_SIZE: int = 500
+    # Автооплата: задачи Celery переводят новые заказы PENDING -> PAID
+    # после создания и досылкой. Сигнала об оплате у них нет, и клиент
+    # не успел бы сам оплатить или отменить заказ, поэтому по умолчанию
+    # выключена
+    ORDER_AUTO_PAY_ENABLED: bool = False
+    ORDER_PROCESSING_SWEEP_INTERVAL: float = 5.0
+    # /debug/* без авторизации показывает внутреннее состояние воркера,
+    # включать только во внутренней сети или при нагрузочных прогонах
+    DEBUG_ROUTES_ENABLED: bool = False
 
 
 settings = Settings()
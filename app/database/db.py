@@ -1,8 +1,19 @@
 import os
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from dotenv import load_dotenv
 
+from app.core.config import settings
+from app.database.pool_metrics import InstrumentedAsyncPool
+from app.services import codec
+from app.services.metrics import instrument_engine
+
 load_dotenv()
 
 POSTGRES_USER = os.getenv("POSTGRES_USER_local")
@@ -11,9 +22,49 @@ POSTGRES_DB = os.getenv("POSTGRES_DB_local")
 DB_HOST = os.getenv("DB_HOST_local")
 DB_PORT = os.getenv("DB_PORT_local")
 
-DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DB_HOST}:{DB_PORT}/{POSTGRES_DB}"
+DATABASE_URL = settings.DATABASE_URL or f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DB_HOST}:{DB_PORT}/{POSTGRES_DB}"
+# Синхронные драйверы для воркеров Celery и скриптов обслуживания:
+# psycogreen и COPY в архивации партиций рассчитаны на psycopg2
+SYNC_DRIVERS = {"postgresql": "psycopg2", "sqlite": "pysqlite"}
+
+
+def sync_database_url(url: str) -> str:
+    db_url = make_url(url)
+    backend = db_url.get_backend_name()
+    driver = SYNC_DRIVERS.get(backend, db_url.get_driver_name())
+    return db_url.set(drivername=f"{backend}+{driver}").render_as_string(
+        hide_password=False
+    )
+
+
+SYNC_DATABASE_URL = sync_database_url(DATABASE_URL)
+
+
+def create_db_engine(url: str) -> AsyncEngine:
+    """Создает движок с общими настройками пула (primary и реплики)"""
+    db_url = make_url(url)
+    # Кэш подготовленных выражений есть только у asyncpg
+    if db_url.get_driver_name() == "asyncpg":
+        db_url = db_url.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_PREPARED_STATEMENT_CACHE_SIZE)}
+        )
+    db_engine = create_async_engine(
+        db_url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        json_serializer=codec.dumps_str,
+        json_deserializer=codec.loads,
+    )
+    instrument_engine(db_engine.sync_engine)
+    return db_engine
+
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = create_db_engine(DATABASE_URL)
 
 
 async_session_maker = async_sessionmaker(
@@ -1,9 +1,47 @@
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession
+import time
+from typing import Annotated, AsyncGenerator, Optional
+
+import redis.asyncio as redis
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.database.db import async_session_maker
+from app.database.replicas import replica_router
+from app.services.metrics import dependency_duration
+from app.services.redis_service import get_redis
+
+
+async def _session(
+    session_maker: async_sessionmaker,
+) -> AsyncGenerator[AsyncSession, None]:
+    start = time.perf_counter()
+    try:
+        async with session_maker() as session:
+            yield session
+    finally:
+        dependency_duration.labels("postgres", "session").observe(
+            time.perf_counter() - start
+        )
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
+    async for session in _session(async_session_maker):
+        yield session
+
+
+async def read_session(
+    redis_client: redis.Redis, user_id: Optional[int]
+) -> AsyncGenerator[AsyncSession, None]:
+    """Сессия реплики, а после недавней записи пользователя - сессия primary"""
+    session_maker = await replica_router.session_maker_for(redis_client, user_id)
+    async for session in _session(session_maker):
+        yield session
+
+
+async def get_user_read_db(
+    user_id: int,
+    redis_client: Annotated[redis.Redis, Depends(get_redis)],
+) -> AsyncGenerator[AsyncSession, None]:
+    """Сессия чтения для маршрутов с user_id в пути"""
+    async for session in read_session(redis_client, user_id):
         yield session
@@ -0,0 +1,244 @@
+"""
+Partitions module - месячные партиции таблицы orders и их архивация.
+
+orders партиционирована по RANGE (created_at), одна партиция на месяц:
+orders_pYYYY_MM. Заказы, созданные до перехода на партиции, лежат
+в orders_legacy (FROM MINVALUE). Партиции на ORDERS_PARTITION_PREMAKE_MONTHS
+месяцев вперед создает периодическая задача Celery; партиции по умолчанию
+нет, поэтому без будущей партиции вставка заказа упадет.
+
+Архивация отсоединяет партиции старше ORDERS_ARCHIVE_AFTER_MONTHS
+(DETACH PARTITION CONCURRENTLY, без блокировки записи), выгружает их
+в ORDERS_ARCHIVE_DIR/<партиция>.csv.gz и удаляет таблицу:
+    python -m app.database.partitions ensure
+    python -m app.database.partitions archive --older-than-months 12
+
+Сводка user_order_stats архивацией не меняется, но пересчет
+app.services.order_stats backfill видит только оставшиеся заказы.
+"""
+import argparse
+import gzip
+import os
+import re
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from loguru import logger
+from sqlalchemy import Connection, Engine, create_engine, text
+
+from app.core.config import settings
+from app.database.db import SYNC_DATABASE_URL
+
+TABLE = "orders"
+
+PARTITIONS_SQL = text(
+    "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), i.inhdetachpending "
+    "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+    "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+)
+IS_PARTITIONED_SQL = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+    "WHERE partrelid = to_regclass(:table))"
+)
+_BOUND = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \((?:'([^']+)'|MAXVALUE)\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    # None - MINVALUE/MAXVALUE
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+    detach_pending: bool = False
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def list_partitions(conn: Connection) -> List[Partition]:
+    partitions = []
+    for name, bound, detach_pending in conn.execute(
+        PARTITIONS_SQL, {"table": TABLE}
+    ):
+        match = _BOUND.search(bound)
+        if match is None:
+            continue
+        lower, upper = (
+            datetime.fromisoformat(value) if value else None
+            for value in match.groups()
+        )
+        partitions.append(Partition(name, lower, upper, detach_pending))
+    return partitions
+
+
+def _overlaps(partition: Partition, start: datetime, end: datetime) -> bool:
+    return (partition.lower is None or partition.lower < end) and (
+        partition.upper is None or partition.upper > start
+    )
+
+
+def ensure_partitions(
+    conn: Connection,
+    months_ahead: int = settings.ORDERS_PARTITION_PREMAKE_MONTHS,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """
+    Создает недостающие партиции с текущего месяца на months_ahead вперед.
+
+    Партиция создается отдельной таблицей и присоединяется через
+    ATTACH PARTITION: это берет на orders SHARE UPDATE EXCLUSIVE
+    вместо ACCESS EXCLUSIVE у CREATE TABLE ... PARTITION OF.
+    Транзакцией управляет вызывающий код.
+    """
+    if conn.dialect.name != "postgresql" or not conn.scalar(
+        IS_PARTITIONED_SQL, {"table": TABLE}
+    ):
+        return []
+
+    # Не ждем блокировку за долгими запросами: задача повторится
+    conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+    existing = list_partitions(conn)
+    first_month = month_start(now or datetime.utcnow())
+    created = []
+    for offset in range(months_ahead + 1):
+        start = add_months(first_month, offset)
+        end = add_months(start, 1)
+        if any(_overlaps(partition, start, end) for partition in existing):
+            continue
+        name = partition_name(start)
+        conn.execute(
+            text(
+                f'CREATE TABLE "{name}" '
+                f"(LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            )
+        )
+        conn.execute(
+            text(
+                f'ALTER TABLE {TABLE} ATTACH PARTITION "{name}" '
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            )
+        )
+        created.append(name)
+        logger.info(f"Created partition {name}")
+    return created
+
+
+def _export(conn: Connection, name: str, path: str) -> int:
+    """Выгружает таблицу в gzip CSV; файл появляется только целиком"""
+    tmp_path = f"{path}.tmp"
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        with gzip.open(tmp_path, "wb") as output:
+            cursor.copy_expert(
+                f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER)', output
+            )
+        rows = cursor.rowcount
+    finally:
+        cursor.close()
+    os.replace(tmp_path, path)
+    return rows
+
+
+def archive_partitions(
+    engine: Engine,
+    older_than_months: int = settings.ORDERS_ARCHIVE_AFTER_MONTHS,
+    output_dir: str = settings.ORDERS_ARCHIVE_DIR,
+    keep: bool = False,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """
+    Отсоединяет партиции, целиком лежащие раньше older_than_months
+    месяцев назад, выгружает их в output_dir и удаляет (если не keep).
+    Возвращает пути выгруженных файлов.
+    """
+    cutoff = add_months(month_start(now or datetime.utcnow()), -older_than_months)
+    os.makedirs(output_dir, exist_ok=True)
+
+    with engine.connect() as conn:
+        partitions = [
+            partition
+            for partition in list_partitions(conn)
+            if partition.upper is not None and partition.upper <= cutoff
+        ]
+
+    archived = []
+    for partition in partitions:
+        # DETACH ... CONCURRENTLY нельзя выполнять внутри транзакции
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            # Прерванное отсоединение завершается через FINALIZE
+            mode = "FINALIZE" if partition.detach_pending else "CONCURRENTLY"
+            conn.execute(
+                text(
+                    f'ALTER TABLE {TABLE} DETACH PARTITION "{partition.name}" '
+                    f"{mode}"
+                )
+            )
+
+        path = os.path.join(output_dir, f"{partition.name}.csv.gz")
+        try:
+            with engine.begin() as conn:
+                expected = conn.scalar(
+                    text(f'SELECT count(*) FROM "{partition.name}"')
+                )
+                rows = _export(conn, partition.name, path)
+                # rowcount равен -1, если драйвер не сообщил число строк COPY
+                if rows not in (-1, expected):
+                    raise RuntimeError(f"exported {rows} of {expected} rows")
+                if not keep:
+                    conn.execute(text(f'DROP TABLE "{partition.name}"'))
+        except Exception as e:
+            # Таблица уже отсоединена от orders, но данные в ней сохранены
+            logger.error(
+                f"Failed to archive detached partition {partition.name}: {e}"
+            )
+            raise
+        archived.append(path)
+        logger.info(
+            f"Archived partition {partition.name}: {expected} orders to {path}"
+        )
+    return archived
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Orders partitions")
+    parser.add_argument("command", choices=["ensure", "archive"])
+    parser.add_argument(
+        "--months-ahead", type=int, default=settings.ORDERS_PARTITION_PREMAKE_MONTHS
+    )
+    parser.add_argument(
+        "--older-than-months", type=int, default=settings.ORDERS_ARCHIVE_AFTER_MONTHS
+    )
+    parser.add_argument("--output-dir", default=settings.ORDERS_ARCHIVE_DIR)
+    parser.add_argument(
+        "--keep", action="store_true", help="не удалять отсоединенные партиции"
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(SYNC_DATABASE_URL)
+    try:
+        if args.command == "ensure":
+            with engine.begin() as conn:
+                created = ensure_partitions(conn, args.months_ahead)
+            logger.info(f"Created {len(created)} partitions")
+        else:
+            archived = archive_partitions(
+                engine, args.older_than_months, args.output_dir, args.keep
+            )
+            logger.info(f"Archived {len(archived)} partitions")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
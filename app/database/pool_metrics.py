@@ -0,0 +1,60 @@
+"""
+Pool metrics module - время ожидания и загрузка пула соединений с БД.
+"""
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_checkout(self, wait_seconds: float) -> None:
+        self.checkouts += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет ожидание свободного соединения при checkout"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self) -> "InstrumentedAsyncPool":
+        # engine.dispose() подменяет пул новым - счетчики переносятся в него
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def connect(self):
+        started_at = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.record_checkout(time.perf_counter() - started_at)
+
+
+def pool_snapshot(pool: InstrumentedAsyncPool) -> Dict[str, Any]:
+    stats = pool.stats
+    checkouts = stats.checkouts or 1
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "in_use": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "avg_checkout_wait_ms": stats.total_wait_seconds / checkouts * 1000,
+        "max_checkout_wait_ms": stats.max_wait_seconds * 1000,
+    }
@@ -0,0 +1,179 @@
+"""
+Replicas module - маршрутизация чтений на реплики Postgres.
+
+Сессии чтения раздаются по кругу между здоровыми репликами из
+DATABASE_REPLICA_URLS. Фоновая проверка раз в DB_REPLICA_HEALTH_INTERVAL
+исключает реплику, если она недоступна, не ответила за
+DB_REPLICA_HEALTH_TIMEOUT секунд или отстает больше чем на
+DB_REPLICA_MAX_LAG секунд; если здоровых реплик нет, чтение идет в primary.
+
+Read-your-writes: после записи пользователя его чтения в течение
+READ_YOUR_WRITES_WINDOW секунд идут в primary. Отметка о записи хранится
+в памяти воркера и в Redis, чтобы ее видели остальные воркеры.
+"""
+import asyncio
+from contextlib import suppress
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.database.db import async_session_maker, create_db_engine
+from app.services.local_cache import LocalCache
+
+# Отставание реплики в секундах; 0, если все полученные WAL уже применены
+REPLICATION_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+class _Replica:
+    __slots__ = ("name", "engine", "session_maker", "healthy", "lag")
+
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.session_maker = async_sessionmaker(
+            engine, expire_on_commit=False, class_=AsyncSession
+        )
+        # До первой проверки реплика считается нездоровой
+        self.healthy = False
+        self.lag: Optional[float] = None
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        urls: List[str],
+        primary: async_sessionmaker = async_session_maker,
+        health_interval: float = settings.DB_REPLICA_HEALTH_INTERVAL,
+        max_lag: float = settings.DB_REPLICA_MAX_LAG,
+        health_timeout: float = settings.DB_REPLICA_HEALTH_TIMEOUT,
+        ryw_window: float = settings.READ_YOUR_WRITES_WINDOW,
+    ):
+        self.primary = primary
+        self.replicas = [
+            _Replica(f"replica-{index}", create_db_engine(url))
+            for index, url in enumerate(urls)
+        ]
+        self.health_interval = health_interval
+        self.max_lag = max_lag
+        self.health_timeout = health_timeout
+        self.ryw_window = ryw_window
+        self._recent_writes = LocalCache(
+            settings.READ_YOUR_WRITES_CACHE_SIZE, ryw_window or 1.0
+        )
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    async def start(self) -> None:
+        if self.replicas:
+            await self.check_health()
+            self._task = asyncio.create_task(self._check_forever())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _replication_lag(self, replica: _Replica) -> float:
+        async with replica.engine.connect() as conn:
+            return float(await conn.scalar(REPLICATION_LAG_SQL))
+
+    async def _check_replica(self, replica: _Replica) -> None:
+        try:
+            replica.lag = await asyncio.wait_for(
+                self._replication_lag(replica), self.health_timeout
+            )
+            healthy = replica.lag <= self.max_lag
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Read replica {replica.name} health check timed out "
+                f"after {self.health_timeout}s"
+            )
+            replica.lag = None
+            healthy = False
+        except Exception as e:
+            logger.warning(f"Read replica {replica.name} is unavailable: {e}")
+            replica.lag = None
+            healthy = False
+        if healthy != replica.healthy:
+            logger.info(f"Read replica {replica.name} healthy: {healthy}")
+        replica.healthy = healthy
+
+    async def check_health(self) -> None:
+        # Реплики проверяются параллельно, каждая не дольше health_timeout
+        await asyncio.gather(
+            *(self._check_replica(replica) for replica in self.replicas)
+        )
+
+    async def _check_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    def _write_key(self, user_id: int) -> str:
+        return f"ryw:{user_id}"
+
+    async def mark_write(self, redis_client: redis.Redis, user_id: int) -> None:
+        """Отмечает запись пользователя, чтобы его чтения шли в primary"""
+        if not self.replicas or not self.ryw_window:
+            return
+        key = self._write_key(user_id)
+        self._recent_writes.set(key, True)
+        try:
+            await redis_client.set(key, 1, px=int(self.ryw_window * 1000))
+        except redis.RedisError as e:
+            logger.error(f"Failed to mark recent write for user {user_id}: {e}")
+
+    async def _recently_wrote(
+        self, redis_client: redis.Redis, user_id: Optional[int]
+    ) -> bool:
+        if user_id is None or not self.ryw_window:
+            return False
+        key = self._write_key(user_id)
+        if self._recent_writes.get(key) is not None:
+            return True
+        try:
+            return bool(await redis_client.exists(key))
+        except redis.RedisError:
+            # Без Redis нельзя исключить недавнюю запись: читаем из primary
+            return True
+
+    async def session_maker_for(
+        self, redis_client: redis.Redis, user_id: Optional[int] = None
+    ) -> async_sessionmaker:
+        """Выбирает фабрику сессий для чтения"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy or await self._recently_wrote(redis_client, user_id):
+            self.primary_reads += 1
+            return self.primary
+        self._next = (self._next + 1) % len(healthy)
+        self.replica_reads += 1
+        return healthy[self._next].session_maker
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "replicas": [
+                {"name": replica.name, "healthy": replica.healthy, "lag": replica.lag}
+                for replica in self.replicas
+            ],
+        }
+
+
+replica_router = ReplicaRouter(
+    [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+)
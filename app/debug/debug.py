@@ -0,0 +1,110 @@
+"""
+Debug module - API для просмотра внутреннего состояния воркера.
+"""
+from typing import Any, Dict
+
+from fastapi import APIRouter, status
+
+from app.auth.auth import token_cache
+from app.auth.hashing import password_hasher
+from app.database.db import engine
+from app.database.pool_metrics import pool_snapshot
+from app.database.replicas import replica_router
+from app.orders.coalescer import order_coalescer
+from app.services.idempotency import order_idempotency
+from app.services.local_cache import order_l1_cache
+from app.services.rate_limiter import limiter_state
+from app.services.redis_service import pool_stats
+
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get(
+    "/cache",
+    status_code=status.HTTP_200_OK,
+    summary="Статистика L1 кэша заказов"
+)
+async def get_cache_stats() -> Dict[str, Any]:
+    """Возвращает счетчики L1 кэша текущего воркера"""
+    return order_l1_cache.stats()
+
+
+@router.get(
+    "/password-hasher",
+    status_code=status.HTTP_200_OK,
+    summary="Статистика пула хэширования паролей"
+)
+async def get_password_hasher_stats() -> Dict[str, Any]:
+    """Возвращает очередь и время выполнения bcrypt в текущем воркере"""
+    return password_hasher.stats()
+
+
+@router.get(
+    "/token-cache",
+    status_code=status.HTTP_200_OK,
+    summary="Статистика кэша проверенных токенов"
+)
+async def get_token_cache_stats() -> Dict[str, Any]:
+    """Возвращает счетчики кэша токенов текущего воркера"""
+    return token_cache.stats()
+
+
+@router.get(
+    "/db-pool",
+    status_code=status.HTTP_200_OK,
+    summary="Состояние пула соединений с БД"
+)
+async def get_db_pool_stats() -> Dict[str, Any]:
+    """Возвращает занятость пула и время ожидания соединения в текущем воркере"""
+    return pool_snapshot(engine.pool)
+
+
+@router.get(
+    "/rate-limiter",
+    status_code=status.HTTP_200_OK,
+    summary="Статистика ограничителя запросов"
+)
+async def get_rate_limiter_stats() -> Dict[str, Any]:
+    """Возвращает число проверок, пропущенных локально и через Redis"""
+    return limiter_state.stats()
+
+
+@router.get(
+    "/db-replicas",
+    status_code=status.HTTP_200_OK,
+    summary="Состояние реплик для чтения"
+)
+async def get_db_replicas_stats() -> Dict[str, Any]:
+    """Возвращает здоровье и отставание реплик и число чтений по типам"""
+    return replica_router.stats()
+
+
+@router.get(
+    "/redis-pool",
+    status_code=status.HTTP_200_OK,
+    summary="Состояние пула соединений Redis"
+)
+async def get_redis_pool_stats() -> Dict[str, Any]:
+    """Возвращает число занятых и свободных соединений пула текущего воркера"""
+    return pool_stats()
+
+
+@router.get(
+    "/order-coalescer",
+    status_code=status.HTTP_200_OK,
+    summary="Статистика объединения вставок заказов"
+)
+async def get_order_coalescer_stats() -> Dict[str, Any]:
+    """Возвращает число пачек, заказов в них и откатов на одиночные вставки"""
+    return order_coalescer.stats()
+
+
+@router.get(
+    "/idempotency",
+    status_code=status.HTTP_200_OK,
+    summary="Статистика ключей идемпотентности"
+)
+async def get_idempotency_stats() -> Dict[str, Any]:
+    """Возвращает счетчики выполненных и повторенных созданий заказов"""
+    return order_idempotency.stats()
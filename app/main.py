@@ -1,20 +1,47 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.auth import auth, register
+from app.auth.hashing import password_hasher
+from app.debug import debug
 from app.orders import order
-import redis.asyncio as redis
-from fastapi_limiter import FastAPILimiter
+from app.orders.coalescer import order_coalescer
 from app.core.config import settings
+from app.database.replicas import replica_router
+from app.services.kafka_service import start_kafka_producer, stop_kafka_producer
+from app.services.local_cache import listen_for_invalidations
+from app.services.metrics import MetricsMiddleware
+from app.services.outbox_relay import OutboxRelay
+from app.services.rate_limiter import limiter_state
+from app.services.redis_service import start_redis, stop_redis
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-    await FastAPILimiter.init(redis_client)
+    redis_client = await start_redis()
+    await limiter_state.init(redis_client)
+    await replica_router.start()
+    await start_kafka_producer()
+    invalidation_task = asyncio.create_task(listen_for_invalidations(redis_client))
+    relay_task = None
+    if settings.OUTBOX_RELAY_ENABLED:
+        relay_task = asyncio.create_task(OutboxRelay().run())
 
     yield
 
+    for task in (relay_task, invalidation_task):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await order_coalescer.close()
+    await limiter_state.close()
+    await replica_router.close()
+    await stop_kafka_producer()
+    await stop_redis()
+    password_hasher.shutdown()
+
 
 app = FastAPI(lifespan=lifespan)
 
@@ -29,7 +56,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(register.router)
 app.include_router(order.router)
+if settings.DEBUG_ROUTES_ENABLED:
+    app.include_router(debug.router)
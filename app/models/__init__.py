@@ -0,0 +1,6 @@
+# Все модели регистрируются вместе, чтобы связи по имени класса
+# разрешались в любом процессе (API, Celery, консольные команды)
+from app.models.users import Users
+from app.models.orders import Orders
+from app.models.outbox import OrderOutbox
+from app.models.order_stats import UserOrderStats
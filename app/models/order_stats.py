@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.db import Base
+
+
+class UserOrderStats(Base):
+    """Сводка заказов пользователя, обновляется в транзакциях записи заказов"""
+
+    __tablename__ = "user_order_stats"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), primary_key=True
+    )
+    orders_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pending_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    paid_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    shipped_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    canceled_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Сумма заказов без отмененных
+    total_spent: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    last_order_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -1,6 +1,8 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Integer, Float, ForeignKey, Enum, JSON, DateTime
+from typing import Dict, FrozenSet, List
+from sqlalchemy import Integer, Float, ForeignKey, Enum, Index, JSON, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database.db import Base
 from enum import Enum as PyEnum
@@ -13,18 +15,79 @@ class OrderStatus(PyEnum):
     CANCELED = "CANCELED"
 
 
+# Допустимые переходы: статус -> статусы, в которые из него можно перейти
+ORDER_STATUS_TRANSITIONS: Dict[OrderStatus, FrozenSet[OrderStatus]] = {
+    OrderStatus.PENDING: frozenset({OrderStatus.PAID, OrderStatus.CANCELED}),
+    OrderStatus.PAID: frozenset({OrderStatus.SHIPPED, OrderStatus.CANCELED}),
+    OrderStatus.SHIPPED: frozenset(),
+    OrderStatus.CANCELED: frozenset(),
+}
+
+# Статусы, из которых заказ еще может перейти дальше
+ACTIVE_ORDER_STATUSES = tuple(
+    current for current, targets in ORDER_STATUS_TRANSITIONS.items() if targets
+)
+
+
+def status_predecessors(target: OrderStatus) -> List[OrderStatus]:
+    """Статусы, из которых разрешен переход в target"""
+    return [
+        current
+        for current, targets in ORDER_STATUS_TRANSITIONS.items()
+        if target in targets
+    ]
+
+
 class Orders(Base):
     __tablename__ = "orders"
+    # Месячные партиции по created_at, см. app.database.partitions
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
 
     id: Mapped[uuid.UUID] = mapped_column(default=uuid.uuid4, primary_key=True)
     user_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("users.id"), nullable=False
     )
-    items: Mapped[dict] = mapped_column(JSON, nullable=False)
+    # JSONB поддерживает поиск по содержимому (@>) через GIN-индекс
+    items: Mapped[dict] = mapped_column(
+        JSONB().with_variant(JSON(), "sqlite"), nullable=False
+    )
     total_price: Mapped[float] = mapped_column(Float, nullable=False)
     status: Mapped[OrderStatus] = mapped_column(
         Enum(OrderStatus), default=OrderStatus.PENDING
     )
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Ключ партиционирования обязан входить в первичный ключ таблицы
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, primary_key=True, default=datetime.utcnow
+    )
+    # Увеличивается при каждом изменении, по ней кэш отбрасывает устаревшие записи
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1"
+    )
 
     user = relationship("Users", back_populates="orders")
+
+    # Заказ по-прежнему однозначно определяется своим id
+    __mapper_args__ = {"primary_key": [id]}
+
+
+# Списки заказов пользователя: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+Index(
+    "ix_orders_user_id_created_at_id",
+    Orders.user_id,
+    Orders.created_at.desc(),
+    Orders.id.desc(),
+)
+# Очередь необработанных заказов: маленький частичный индекс без завершенных
+Index(
+    "ix_orders_active_status_created_at",
+    Orders.status,
+    Orders.created_at,
+    postgresql_where=Orders.status.in_(ACTIVE_ORDER_STATUSES),
+)
+# Поиск заказов по позициям: WHERE items @> '[{"sku": ...}]'
+Index(
+    "ix_orders_items_gin",
+    Orders.items,
+    postgresql_using="gin",
+    postgresql_ops={"items": "jsonb_path_ops"},
+)
@@ -0,0 +1,119 @@
+"""
+Insert coalescer - объединение одновременных созданий заказов в один INSERT.
+
+Заказы, пришедшие в течение окна ORDERS_COALESCE_WINDOW_MS, вставляются
+одним INSERT ... RETURNING и одним коммитом в собственной сессии, после
+чего каждый ожидающий запрос получает свою строку. Пачка сбрасывается
+раньше, если набралось ORDERS_COALESCE_MAX_BATCH заказов. Если пачка
+не вставилась целиком, заказы вставляются по одному, чтобы ошибка одного
+не ломала остальные.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.database.db import async_session_maker
+from app.orders.crud import insert_orders
+
+_Pending = Tuple[Dict[str, Any], asyncio.Future]
+
+
+class InsertCoalescer:
+    def __init__(
+        self,
+        session_maker: async_sessionmaker = async_session_maker,
+        window: float = settings.ORDERS_COALESCE_WINDOW_MS / 1000,
+        max_batch: int = settings.ORDERS_COALESCE_MAX_BATCH,
+    ):
+        self._session_maker = session_maker
+        self._window = window
+        self._max_batch = max_batch
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.orders = 0
+        self.fallbacks = 0
+
+    async def insert(self, values: Dict[str, Any]) -> Row:
+        """Ставит заказ в текущую пачку и ждет вставленную строку"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((values, future))
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[: self._max_batch]
+            del self._pending[: self._max_batch]
+            task = asyncio.create_task(self._insert_batch(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _insert_batch(self, batch: List[_Pending]) -> None:
+        self.batches += 1
+        self.orders += len(batch)
+        try:
+            rows = await self._insert([values for values, _ in batch])
+        except Exception as e:
+            logger.warning(f"Coalesced insert of {len(batch)} orders failed: {e}")
+            self.fallbacks += 1
+            for values, future in batch:
+                try:
+                    row = (await self._insert([values]))[0]
+                except Exception as error:
+                    _resolve(future, error=error)
+                else:
+                    _resolve(future, row)
+            return
+
+        # RETURNING не гарантирует порядок строк, сопоставляем по id
+        by_id = {row.id: row for row in rows}
+        for values, future in batch:
+            _resolve(future, by_id[values["id"]])
+
+    async def _insert(self, orders: List[Dict[str, Any]]) -> List[Row]:
+        async with self._session_maker() as session:
+            rows = list(await insert_orders(session, orders))
+            await session.commit()
+        return rows
+
+    async def close(self) -> None:
+        """Сбрасывает накопленные заказы и дожидается всех вставок"""
+        self._flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "orders": self.orders,
+            "fallbacks": self.fallbacks,
+            "avg_batch_size": self.orders / self.batches if self.batches else 0.0,
+        }
+
+
+def _resolve(
+    future: asyncio.Future, row: Optional[Row] = None, error: Optional[Exception] = None
+) -> None:
+    # Запрос мог быть отменен, пока пачка вставлялась
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(row)
+
+
+order_coalescer = InsertCoalescer()
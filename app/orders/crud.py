@@ -0,0 +1,158 @@
+"""
+Операции записи заказов, общие для одиночного и пакетного создания.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+from uuid import UUID
+
+from sqlalchemy import Row, Update, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.orders import OrderStatus, Orders, status_predecessors
+from app.models.outbox import OrderOutbox
+from app.orders.ids import created_at_filter, new_order_id
+from app.schemas import CreateOrder
+from app.services.order_stats import record_created, record_transitions
+
+NEW_ORDERS_TOPIC = "new_orders"
+
+
+def build_order_values(user_id: int, create_order: CreateOrder) -> Dict[str, Any]:
+    """Готовит значения строки заказа с id, сгенерированным на клиенте"""
+    created_at = datetime.utcnow()
+    return {
+        "id": new_order_id(created_at),
+        "user_id": user_id,
+        "items": create_order.items,
+        "total_price": create_order.total_price,
+        "status": OrderStatus(create_order.status.value),
+        "created_at": created_at,
+        "version": 1,
+    }
+
+
+def order_event(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": str(values["id"]),
+        "user_id": values["user_id"],
+        "items": values["items"],
+        "total_price": values["total_price"],
+        "status": values["status"].value,
+        "created_at": values["created_at"].isoformat(),
+        "version": values["version"],
+    }
+
+
+async def insert_orders(
+    db: AsyncSession, orders: List[Dict[str, Any]]
+) -> Sequence[Row]:
+    """
+    Вставляет заказы одним INSERT ... RETURNING, добавляет их события
+    в outbox и обновляет сводку пользователей в той же транзакции.
+    Коммит остается за вызывающим кодом.
+    """
+    result = await db.execute(
+        insert(Orders).values(orders).returning(*Orders.__table__.c)
+    )
+    rows = result.all()
+    await record_created(db, rows)
+    await db.execute(
+        insert(OrderOutbox).values(
+            [
+                {
+                    "topic": NEW_ORDERS_TOPIC,
+                    "key": str(values["id"]),
+                    "payload": order_event(values),
+                    "created_at": values["created_at"],
+                }
+                for values in orders
+            ]
+        )
+    )
+    return rows
+
+
+def transition_statement(
+    user_id: int, order_ids: List[UUID], target: OrderStatus
+) -> Update:
+    """
+    Переводит заказы пользователя в target одним запросом:
+
+        WITH old AS (SELECT id, created_at, status ... FOR UPDATE)
+        UPDATE orders ... WHERE (id, created_at) IN (SELECT ... FROM old)
+        RETURNING orders.*, (SELECT old_status FROM old ...) AS previous_status
+
+    Меняются только заказы в статусах, из которых переход в target разрешен
+    ORDER_STATUS_TRANSITIONS. Старый статус нужен сводке пользователя,
+    поэтому строки блокируются в CTE и он возвращается вместе с новыми
+    значениями. UPDATE ищет строки по первичному ключу (id, created_at),
+    а для UUIDv7 еще и по окну created_at, чтобы проверялись только
+    партиции с этими заказами.
+    """
+    # SQLite пишет столбцы в RETURNING без имени таблицы, поэтому имена
+    # столбцов CTE не должны совпадать с именами столбцов orders
+    old = (
+        select(
+            Orders.id.label("old_id"),
+            Orders.created_at.label("old_created_at"),
+            Orders.status.label("old_status"),
+        )
+        .where(
+            Orders.id.in_(order_ids),
+            *created_at_filter(order_ids),
+            Orders.user_id == user_id,
+            Orders.status.in_(status_predecessors(target)),
+        )
+        .with_for_update()
+        .cte("old")
+        # В Postgres все части запроса видят снимок до UPDATE. SQLite же
+        # вычисляет подзапрос RETURNING после записи строки и без
+        # материализации пересчитал бы CTE по уже новым статусам
+        .prefix_with("MATERIALIZED")
+    )
+    previous_status = (
+        select(old.c.old_status).where(old.c.old_id == Orders.id).scalar_subquery()
+    )
+    return (
+        update(Orders)
+        .where(
+            tuple_(Orders.id, Orders.created_at).in_(
+                select(old.c.old_id, old.c.old_created_at)
+            ),
+            *created_at_filter(order_ids),
+        )
+        .values(status=target, version=Orders.version + 1)
+        .returning(*Orders.__table__.c, previous_status.label("previous_status"))
+    )
+
+
+async def transition_orders(
+    db: AsyncSession, user_id: int, order_ids: List[UUID], target: OrderStatus
+) -> Sequence[Row]:
+    """
+    Выполняет transition_statement и обновляет сводку пользователя
+    в той же транзакции. Коммит остается за вызывающим кодом.
+    """
+    result = await db.execute(transition_statement(user_id, order_ids, target))
+    rows = result.all()
+    await record_transitions(
+        db,
+        [
+            (row.user_id, OrderStatus(row.previous_status), row.status, row.total_price)
+            for row in rows
+        ],
+    )
+    return rows
+
+
+def order_to_dict(order) -> Dict[str, Any]:
+    """Сериализует заказ (ORM-объект или строку выборки) в словарь"""
+    return {
+        "id": order.id,
+        "user_id": order.user_id,
+        "items": order.items,
+        "total_price": order.total_price,
+        "status": order.status.value,
+        "created_at": order.created_at,
+        "version": order.version,
+    }
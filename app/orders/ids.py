@@ -0,0 +1,54 @@
+"""
+Order ids module - идентификаторы заказов с временем создания внутри.
+
+Новые заказы получают UUIDv7: старшие 48 бит - миллисекунды created_at.
+По id можно восстановить окно created_at и добавить его в запрос, чтобы
+Postgres просматривал только партицию нужного месяца. Для старых заказов
+с UUIDv4 окна нет, и запрос проверяет все партиции.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import ColumnElement
+
+from app.models.orders import Orders
+
+_EPOCH = datetime(1970, 1, 1)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def new_order_id(created_at: datetime) -> UUID:
+    """UUIDv7 (RFC 9562) с меткой времени created_at (наивное UTC)"""
+    ms = (created_at - _EPOCH) // _MILLISECOND
+    value = (ms << 80) | int.from_bytes(os.urandom(10), "big")
+    # Версия 7 в битах 76-79, вариант 0b10 в битах 62-63
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return UUID(int=value)
+
+
+def created_at_window(
+    order_ids: Iterable[UUID],
+) -> Optional[Tuple[datetime, datetime]]:
+    """Полуинтервал created_at, покрывающий заказы; None, если не все id v7"""
+    stamps = []
+    for order_id in order_ids:
+        if order_id.version != 7:
+            return None
+        stamps.append(order_id.int >> 80)
+    if not stamps:
+        return None
+    return (
+        _EPOCH + min(stamps) * _MILLISECOND,
+        _EPOCH + (max(stamps) + 1) * _MILLISECOND,
+    )
+
+
+def created_at_filter(order_ids: Iterable[UUID]) -> List[ColumnElement[bool]]:
+    """Условия на created_at для выборки заказов по id"""
+    window = created_at_window(order_ids)
+    if window is None:
+        return []
+    return [Orders.created_at >= window[0], Orders.created_at < window[1]]
@@ -1,32 +1,81 @@
 """
 Orders module - API для управления заказами в системе.
 """
-from datetime import datetime
-import json
-from typing import Annotated, Dict, Any
+from datetime import datetime, timezone
+from typing import Annotated, Any, AsyncIterator, Dict, List, Optional
 from uuid import UUID
 
-from aiokafka import AIOKafkaProducer
-from fastapi import APIRouter, Depends, Request, status, HTTPException
-from fastapi_limiter.depends import RateLimiter
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from loguru import logger
+from pydantic import ValidationError
 import redis.asyncio as redis
-from sqlalchemy import select, update
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.auth.auth import get_current_user
-from app.database.db_depends import get_db
+from app.core.config import settings
+from app.database.db_depends import get_db, get_user_read_db, read_session
+from app.database.replicas import replica_router
+from app.models import orders as order_models
 from app.models.orders import Orders
-from app.schemas import CreateOrder, UpdateStatus
-from app.services.kafka_service import get_kafka_producer
+from app.orders.coalescer import order_coalescer
+from app.orders.crud import (
+    build_order_values,
+    insert_orders,
+    order_to_dict,
+    transition_orders,
+)
+from app.orders.ids import created_at_filter
+from app.orders.pagination import next_cursor, paginate
+from app.models.order_stats import UserOrderStats
+from app.schemas import (
+    BulkUpdateStatus,
+    CreateOrder,
+    OrderOut,
+    OrdersBatch,
+    OrdersPage,
+    OrderStatus,
+    UpdateStatus,
+    UserOrderStatsOut,
+)
+from app.services import codec, idempotency, order_cache, order_stats
+from app.services.idempotency import order_idempotency
+from app.services.rate_limiter import RateLimiter
 from app.services.redis_service import get_redis
-from app.tasks.order_task import process_order
+from app.tasks.order_task import process_order, process_orders_batch
 
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
+def naive_utc(value: datetime) -> datetime:
+    """Приводит время к наивному UTC, как в колонке created_at"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def get_current_user_read_db(
+    redis_client: Annotated[redis.Redis, Depends(get_redis)],
+    current_user: Annotated[dict, Depends(get_current_user)],
+) -> AsyncIterator[AsyncSession]:
+    """Сессия чтения с учетом недавних записей текущего пользователя"""
+    async for session in read_session(redis_client, current_user["id"]):
+        yield session
+
+
 @router.post(
     "/",
     status_code=status.HTTP_201_CREATED,
@@ -35,52 +84,299 @@ router = APIRouter(prefix="/orders", tags=["orders"])
 )
 async def create_order(
     request: Request,
+    response: Response,
     db: Annotated[AsyncSession, Depends(get_db)],
+    redis_client: Annotated[redis.Redis, Depends(get_redis)],
     create_order: CreateOrder,
-    kafka_producer: Annotated[AIOKafkaProducer, Depends(get_kafka_producer)],
     current_user: Annotated[dict, Depends(get_current_user)],
+    idempotency_key: Annotated[Optional[str], Header(max_length=255)] = None,
 ) -> Dict[str, Any]:
-    """Создает новый заказ и запускает его обработку"""
-    try:
-        new_order = Orders(
-            user_id=current_user["id"],
-            items=create_order.items,
-            total_price=create_order.total_price,
-            status=create_order.status,
-            created_at=datetime.utcnow(),
-        )
+    """
+    Создает новый заказ. С ORDER_AUTO_PAY_ENABLED ставит в очередь
+    его автооплату.
+
+    Событие new_orders записывается в outbox в той же транзакции,
+    что и заказ, и отправляется в Kafka фоновым релеем.
+    С ORDERS_COALESCE_ENABLED одновременные создания вставляются пачкой.
 
-        db.add(new_order)
-        await db.commit()
-        await db.refresh(new_order)
+    Повтор с тем же заголовком Idempotency-Key не создает второй заказ,
+    а получает ответ первого запроса с заголовком Idempotent-Replayed.
+    """
 
-        order_data = {
-            "id": str(new_order.id),
-            "user_id": new_order.user_id,
-            "items": new_order.items,
-            "total_price": new_order.total_price,
-            "status": new_order.status.value,
-            "created_at": new_order.created_at.isoformat(),
-        }
+    async def create() -> Dict[str, Any]:
+        try:
+            values = build_order_values(current_user["id"], create_order)
+            if settings.ORDERS_COALESCE_ENABLED:
+                row = await order_coalescer.insert(values)
+            else:
+                row = (await insert_orders(db, [values]))[0]
+                await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error creating order: {str(e)}",
+            )
 
-        process_order.delay(str(new_order.id))
-        response = {"detail": "Order created successfully", "id": new_order.id}
+        # Заказ уже закоммичен: дальнейшие сбои не должны давать клиенту
+        # ошибку, иначе повтор запроса создаст второй заказ
+        if settings.ORDER_AUTO_PAY_ENABLED:
+            try:
+                process_order.delay(str(values["id"]))
+            except Exception as e:
+                logger.error(f"Failed to enqueue order {values['id']}: {e}")
+        await replica_router.mark_write(redis_client, current_user["id"])
+        await order_cache.store_order(redis_client, order_to_dict(row))
+        return {"detail": "Order created successfully", "id": values["id"]}
 
+    if idempotency_key is None:
+        return await create()
+
+    body, replayed = await order_idempotency.run(
+        redis_client,
+        current_user["id"],
+        idempotency_key,
+        idempotency.fingerprint(await request.body()),
+        create,
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
+
+
+@router.post(
+    "/batch",
+    status_code=status.HTTP_207_MULTI_STATUS,
+    dependencies=[Depends(RateLimiter(times=15, seconds=60))],
+    summary="Пакетное создание заказов"
+)
+async def create_orders_batch(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    redis_client: Annotated[redis.Redis, Depends(get_redis)],
+    orders: Annotated[
+        List[Dict[str, Any]], Body(max_length=settings.ORDERS_BATCH_MAX_SIZE)
+    ],
+    current_user: Annotated[dict, Depends(get_current_user)],
+) -> Dict[str, Any]:
+    """
+    Создает пачку заказов одним INSERT ... RETURNING и одним коммитом.
+
+    Каждый элемент валидируется отдельно, результат возвращается по индексу.
+    С ORDER_AUTO_PAY_ENABLED автооплата ставится в Celery пачками.
+    События уходят через outbox.
+    """
+    results: List[Dict[str, Any]] = []
+    values_list = []
+    for index, payload in enumerate(orders):
         try:
-            await kafka_producer.send_and_wait(
-                "new_orders", json.dumps(order_data).encode("utf-8")
+            create_order = CreateOrder.model_validate(payload)
+        except ValidationError as e:
+            results.append(
+                {
+                    "index": index,
+                    "status": "failed",
+                    "errors": [
+                        {"loc": error["loc"], "msg": error["msg"]}
+                        for error in e.errors()
+                    ],
+                }
             )
-        except Exception as kafka_error:
-            logger.error(f"Error sending to Kafka: {kafka_error}")
+            continue
+        values = build_order_values(current_user["id"], create_order)
+        values_list.append(values)
+        results.append({"index": index, "status": "created", "id": values["id"]})
 
-        return response
-    except Exception as e:
-        await db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error creating order: {str(e)}",
+    if values_list:
+        try:
+            rows = await insert_orders(db, values_list)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error creating orders: {str(e)}",
+            )
+
+        await replica_router.mark_write(redis_client, current_user["id"])
+        if settings.ORDER_AUTO_PAY_ENABLED:
+            order_ids = [str(values["id"]) for values in values_list]
+            chunk = settings.ORDERS_BATCH_TASK_CHUNK
+            try:
+                for start in range(0, len(order_ids), chunk):
+                    process_orders_batch.delay(order_ids[start:start + chunk])
+            except Exception as e:
+                logger.error(f"Failed to enqueue created orders: {e}")
+        await order_cache.store_orders(
+            redis_client, [order_to_dict(row) for row in rows]
+        )
+
+    return {
+        "created": len(values_list),
+        "failed": len(results) - len(values_list),
+        "results": results,
+    }
+
+
+@router.get(
+    "/batch",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RateLimiter(times=20, seconds=60))],
+    summary="Получение заказов по списку ID"
+)
+async def get_orders_batch(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_current_user_read_db)],
+    redis_client: Annotated[redis.Redis, Depends(get_redis)],
+    ids: Annotated[
+        List[UUID], Query(min_length=1, max_length=settings.ORDERS_BATCH_GET_MAX_IDS)
+    ],
+    current_user: Annotated[dict, Depends(get_current_user)],
+) -> OrdersBatch:
+    """
+    Получает пачку заказов по ID с использованием кэширования.
+
+    Заказы берутся из L1 кэша воркера и одним MGET из Redis, промахи
+    загружаются из базы одним запросом. Чужие и несуществующие заказы
+    возвращаются в not_found.
+    """
+    order_ids = list(dict.fromkeys(ids))
+
+    async def load_orders(missing: List[UUID]) -> List[Dict[str, Any]]:
+        result = await db.execute(
+            select(*Orders.__table__.c).where(
+                Orders.id.in_(missing), *created_at_filter(missing)
+            )
+        )
+        return [order_to_dict(row) for row in result.all()]
+
+    found = await order_cache.get_or_load_orders(redis_client, order_ids, load_orders)
+    orders: List[Dict[str, Any]] = []
+    not_found: List[UUID] = []
+    for order_id in order_ids:
+        order_dict = found.get(str(order_id))
+        if order_dict is None or order_dict["user_id"] != current_user["id"]:
+            not_found.append(order_id)
+        else:
+            orders.append(order_dict)
+    return {"orders": orders, "not_found": not_found}
+
+
+@router.get(
+    "/search",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RateLimiter(times=20, seconds=60))],
+    summary="Поиск заказов по позициям и фильтрам"
+)
+async def search_orders(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_current_user_read_db)],
+    current_user: Annotated[dict, Depends(get_current_user)],
+    sku: Annotated[Optional[List[str]], Query()] = None,
+    order_status: Annotated[Optional[OrderStatus], Query(alias="status")] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: Annotated[int, Query(ge=1, le=settings.ORDERS_PAGE_MAX_LIMIT)] = 50,
+    cursor: Optional[str] = None,
+) -> OrdersPage:
+    """
+    Ищет заказы текущего пользователя, содержащие все переданные sku,
+    с фильтрами по статусу, дате создания и сумме. Результат отдается
+    страницами от новых к старым, как в списке заказов пользователя.
+    Границы дат со смещением (Z, +03:00) переводятся в UTC.
+
+    Позиции ищутся условием items @> '[{"sku": ...}]' по GIN-индексу,
+    поэтому поиск по sku работает только на PostgreSQL.
+    """
+    stmt = select(*Orders.__table__.c).where(Orders.user_id == current_user["id"])
+    if sku:
+        if db.get_bind().dialect.name != "postgresql":
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="Search by sku requires PostgreSQL",
+            )
+        stmt = stmt.where(Orders.items.contains([{"sku": value} for value in sku]))
+    if order_status is not None:
+        stmt = stmt.where(Orders.status == order_status)
+    if created_from is not None:
+        stmt = stmt.where(Orders.created_at >= naive_utc(created_from))
+    if created_to is not None:
+        stmt = stmt.where(Orders.created_at < naive_utc(created_to))
+    if min_price is not None:
+        stmt = stmt.where(Orders.total_price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(Orders.total_price <= max_price)
+
+    result = await db.execute(paginate(stmt, cursor, limit))
+    rows = list(result.all())
+    cursor = next_cursor(rows, limit)
+    return {"orders": [order_to_dict(row) for row in rows], "next_cursor": cursor}
+
+
+@router.put(
+    "/status",
+    status_code=status.HTTP_207_MULTI_STATUS,
+    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    summary="Пакетное обновление статуса заказов"
+)
+async def update_orders_status(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    redis_client: Annotated[redis.Redis, Depends(get_redis)],
+    update_status: BulkUpdateStatus,
+    current_user: Annotated[dict, Depends(get_current_user)],
+) -> Dict[str, Any]:
+    """
+    Переводит пачку заказов в один статус одним UPDATE ... RETURNING
+    и одним коммитом.
+
+    Заказы, для которых переход не разрешен ORDER_STATUS_TRANSITIONS,
+    не меняются; результат возвращается по каждому id.
+    """
+    order_ids = list(dict.fromkeys(update_status.order_ids))
+    target = order_models.OrderStatus(update_status.status.value)
+    rows = await transition_orders(db, current_user["id"], order_ids, target)
+    updated = {row.id: row for row in rows}
+    skipped = [order_id for order_id in order_ids if order_id not in updated]
+    current: Dict[UUID, order_models.OrderStatus] = {}
+    if skipped:
+        result = await db.execute(
+            select(Orders.id, Orders.status).where(
+                Orders.id.in_(skipped), Orders.user_id == current_user["id"]
+            )
+        )
+        current = {row.id: row.status for row in result}
+    await db.commit()
+
+    results: List[Dict[str, Any]] = []
+    for order_id in order_ids:
+        if order_id in updated:
+            results.append({"id": order_id, "status": "updated"})
+        elif order_id in current:
+            results.append(
+                {
+                    "id": order_id,
+                    "status": "invalid_transition",
+                    "current_status": current[order_id].value,
+                }
+            )
+        else:
+            results.append({"id": order_id, "status": "not_found"})
+
+    if rows:
+        await replica_router.mark_write(redis_client, current_user["id"])
+        await order_cache.store_changed_orders(
+            redis_client, [order_to_dict(row) for row in rows]
         )
 
+    return {
+        "updated": len(rows),
+        "failed": len(order_ids) - len(rows),
+        "results": results,
+    }
+
 
 @router.get(
     "/{order_id}",
@@ -91,30 +387,32 @@ async def create_order(
 async def get_order(
     request: Request,
     order_id: UUID,
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_current_user_read_db)],
     redis_client: Annotated[redis.Redis, Depends(get_redis)],
     current_user: Annotated[dict, Depends(get_current_user)],
-) -> Dict[str, Any]:
-    """Получает заказ по ID с использованием кэширования"""
-    cached_order = await redis_client.get(f"order:{order_id}")
-    if cached_order:
-        return json.loads(cached_order)
-
-    order = await db.scalar(
-        select(Orders).where(
-            Orders.id == order_id, Orders.user_id == current_user["id"]
-        )
-    )
+) -> OrderOut:
+    """
+    Получает заказ по ID с использованием кэширования.
 
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+    Сначала проверяется L1 кэш воркера, затем Redis, затем база.
+    Одновременные промахи по одному заказу идут в базу одним запросом.
+    """
 
-    order_dict = order.__dict__
-    del order_dict["_sa_instance_state"]
+    async def load_order() -> Optional[Dict[str, Any]]:
+        order = await db.scalar(
+            select(Orders).where(Orders.id == order_id, *created_at_filter([order_id]))
+        )
+        if order is None:
+            return None
+        order_dict = order_to_dict(order)
+        await order_cache.store_order(redis_client, order_dict)
+        return order_dict
 
-    await redis_client.setex(
-        f"order:{order_id}", 300, json.dumps(order_dict, default=str)
+    order_dict = await order_cache.get_or_load_order(
+        redis_client, order_id, load_order
     )
+    if order_dict is None or order_dict["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=404, detail="Order not found")
 
     return order_dict
 
@@ -128,30 +426,42 @@ async def get_order(
 async def update_product(
     request: Request,
     db: Annotated[Session, Depends(get_db)],
+    redis_client: Annotated[redis.Redis, Depends(get_redis)],
     order_id: UUID,
     update_status: UpdateStatus,
     current_user: Annotated[dict, Depends(get_current_user)],
 ) -> Dict[str, str]:
-    """Обновляет статус существующего заказа"""
-    order = await db.scalar(
-        select(Orders).where(
-            Orders.id == order_id, Orders.user_id == current_user["id"]
+    """
+    Обновляет статус существующего заказа одним UPDATE ... RETURNING.
+
+    Переход должен быть разрешен ORDER_STATUS_TRANSITIONS, иначе 409.
+    """
+    target = order_models.OrderStatus(update_status.status.value)
+    rows = await transition_orders(db, current_user["id"], [order_id], target)
+    if not rows:
+        # Запрос только на отказе: отличаем чужой или несуществующий заказ
+        current = await db.scalar(
+            select(Orders.status).where(
+                Orders.id == order_id, Orders.user_id == current_user["id"]
+            )
         )
-    )
-    if order is None:
+        await db.rollback()
+        if current is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
+            )
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
-        )
-
-    await db.execute(
-        update(Orders)
-        .where(Orders.id == order.id)
-        .values(
-            status=update_status.status,
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                f"Cannot change order status from {current.value} "
+                f"to {update_status.status.value}"
+            ),
         )
-    )
     await db.commit()
 
+    await replica_router.mark_write(redis_client, current_user["id"])
+    await order_cache.store_order(redis_client, order_to_dict(rows[0]), changed=True)
+
     return {"detail": "Product updated successfully"}
 
 
@@ -163,17 +473,87 @@ async def update_product(
 )
 async def get_orders_for_user(
     request: Request,
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_user_read_db)],
     user_id: int,
-):
-    """Возвращает все заказы указанного пользователя"""
-    orders = await db.scalars(select(Orders).where(Orders.user_id == user_id))
-    orders_list = orders.all()
-    
-    if not orders_list:
+    limit: Annotated[int, Query(ge=1, le=settings.ORDERS_PAGE_MAX_LIMIT)] = 50,
+    cursor: Optional[str] = None,
+) -> OrdersPage:
+    """
+    Возвращает страницу заказов пользователя, от новых к старым.
+
+    Для следующей страницы передайте next_cursor из ответа в параметр cursor.
+    """
+    result = await db.execute(
+        paginate(
+            select(*Orders.__table__.c).where(Orders.user_id == user_id),
+            cursor,
+            limit,
+        )
+    )
+    rows = list(result.all())
+
+    if not rows and cursor is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No orders for user_id: {user_id}",
         )
-    
-    return orders_list
\ No newline at end of file
+
+    cursor = next_cursor(rows, limit)
+    return {"orders": [order_to_dict(row) for row in rows], "next_cursor": cursor}
+
+
+@router.get(
+    "/user/{user_id}/stats",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RateLimiter(times=20, seconds=60))],
+    summary="Сводка заказов пользователя"
+)
+async def get_order_stats_for_user(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_user_read_db)],
+    user_id: int,
+) -> UserOrderStatsOut:
+    """
+    Возвращает число заказов по статусам, сумму покупок и время
+    последнего заказа. Сводка читается одной строкой по ключу.
+    """
+    stats = await db.get(UserOrderStats, user_id)
+    return order_stats.stats_to_dict(user_id, stats)
+
+
+@router.get(
+    "/user/{user_id}/stream",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RateLimiter(times=20, seconds=60))],
+    summary="Потоковая выгрузка заказов пользователя"
+)
+async def stream_orders_for_user(
+    request: Request,
+    redis_client: Annotated[redis.Redis, Depends(get_redis)],
+    user_id: int,
+) -> StreamingResponse:
+    """
+    Отдает все заказы пользователя в формате NDJSON.
+
+    Строки читаются серверным курсором порциями, поэтому память
+    не зависит от количества заказов.
+    """
+
+    session_maker = await replica_router.session_maker_for(redis_client, user_id)
+
+    async def ndjson() -> AsyncIterator[bytes]:
+        # Сессия открывается внутри генератора: зависимости запроса
+        # закрываются до того, как ответ будет дочитан
+        async with session_maker() as session:
+            result = await session.stream(
+                select(*Orders.__table__.c)
+                .where(Orders.user_id == user_id)
+                .order_by(Orders.created_at.desc(), Orders.id.desc())
+                .execution_options(yield_per=settings.ORDERS_STREAM_CHUNK_SIZE)
+            )
+            async for rows in result.partitions():
+                yield b"".join(
+                    codec.dumps(order_to_dict(row)) + b"\n" for row in rows
+                )
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
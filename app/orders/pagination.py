@@ -0,0 +1,50 @@
+"""
+Keyset-пагинация заказов по (created_at, id).
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, tuple_
+
+from app.models.orders import Orders
+
+
+def encode_cursor(created_at: datetime, order_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{order_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, order_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(order_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def paginate(stmt: Select, cursor: Optional[str], limit: int) -> Select:
+    """
+    Сортирует выборку от новых к старым и отдает страницу после курсора.
+
+    Берется limit + 1 строка, чтобы понять, есть ли следующая страница.
+    """
+    if cursor is not None:
+        stmt = stmt.where(
+            tuple_(Orders.created_at, Orders.id) < tuple_(*decode_cursor(cursor))
+        )
+    return stmt.order_by(Orders.created_at.desc(), Orders.id.desc()).limit(limit + 1)
+
+
+def next_cursor(rows: list, limit: int) -> Optional[str]:
+    """Возвращает курсор следующей страницы и обрезает лишнюю строку"""
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    last = rows[-1]
+    return encode_cursor(last.created_at, last.id)
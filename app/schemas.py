@@ -1,7 +1,10 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from uuid import UUID
+
+from app.core.config import settings
 
 
 class CreateUser(BaseModel):
@@ -25,3 +28,41 @@ class CreateOrder(BaseModel):
 
 class UpdateStatus(BaseModel):
     status: OrderStatus = OrderStatus.PENDING
+
+
+class BulkUpdateStatus(BaseModel):
+    order_ids: List[UUID] = Field(
+        min_length=1, max_length=settings.ORDERS_BATCH_MAX_SIZE
+    )
+    status: OrderStatus
+
+
+class OrderOut(BaseModel):
+    id: UUID
+    user_id: int
+    items: List[Dict[str, Any]]
+    total_price: float
+    status: OrderStatus
+    created_at: datetime
+    version: int
+
+
+class OrdersPage(BaseModel):
+    orders: List[OrderOut]
+    next_cursor: Optional[str] = None
+
+
+class OrdersBatch(BaseModel):
+    orders: List[OrderOut]
+    not_found: List[UUID]
+
+
+class UserOrderStatsOut(BaseModel):
+    user_id: int
+    orders_count: int
+    pending_count: int
+    paid_count: int
+    shipped_count: int
+    canceled_count: int
+    total_spent: float
+    last_order_at: Optional[datetime] = None
@@ -0,0 +1,21 @@
+"""
+Codec module - общий компактный JSON-кодек для кэша, событий и NDJSON.
+
+orjson сам сериализует UUID, datetime и Enum, поэтому default=str не нужен.
+"""
+from typing import Any
+
+import orjson
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+def dumps_str(obj: Any) -> str:
+    """Вариант для драйверов БД, которые ожидают строку"""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    return orjson.loads(data)
@@ -0,0 +1,195 @@
+"""
+Idempotency module - повторы запросов с заголовком Idempotency-Key.
+
+Первый запрос с ключом резервирует его атомарным SET NX и выполняет
+обработчик; результат сохраняется в Redis на IDEMPOTENCY_TTL секунд
+и отдается повторам без повторной записи в базу. Повтор, пришедший,
+пока первый запрос еще выполняется, ждет его результат. Если обработчик
+упал, резерв снимается, и следующий повтор выполнит запрос заново.
+
+Ключ привязан к отпечатку тела запроса: тот же ключ с другим телом
+отклоняется с 422. Без Redis запросы выполняются без защиты от повторов.
+"""
+import asyncio
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from uuid import uuid4
+
+import redis.asyncio as redis
+from fastapi import HTTPException, status
+from loguru import logger
+
+from app.core.config import settings
+from app.services import codec
+
+# Записывает результат, только если резерв все еще принадлежит запросу
+COMPLETE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and cjson.decode(current)['token'] == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and cjson.decode(current)['token'] == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+
+def fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        scope: str,
+        ttl: int = settings.IDEMPOTENCY_TTL,
+        lock_ttl_ms: int = settings.IDEMPOTENCY_LOCK_TTL_MS,
+        wait_timeout: float = settings.IDEMPOTENCY_WAIT_TIMEOUT,
+    ):
+        self.scope = scope
+        self.ttl = ttl
+        self.lock_ttl_ms = lock_ttl_ms
+        self.wait_timeout = wait_timeout
+        self.executed = 0
+        self.replayed = 0
+        self.waited = 0
+        self.mismatches = 0
+        self.unavailable = 0
+
+    def _key(self, user_id: int, idempotency_key: str) -> str:
+        return f"idem:{self.scope}:{user_id}:{idempotency_key}"
+
+    async def run(
+        self,
+        redis_client: redis.Redis,
+        user_id: int,
+        idempotency_key: str,
+        request_fingerprint: str,
+        handler: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Выполняет handler один раз на ключ. Возвращает тело ответа
+        и признак того, что это сохраненный ответ первого запроса.
+        """
+        key = self._key(user_id, idempotency_key)
+        token = uuid4().hex
+        reservation = codec.dumps(
+            {"token": token, "state": IN_PROGRESS, "fingerprint": request_fingerprint}
+        )
+        deadline = time.monotonic() + self.wait_timeout
+        try:
+            while True:
+                if await redis_client.set(
+                    key, reservation, nx=True, px=self.lock_ttl_ms
+                ):
+                    break
+                record = await self._wait(
+                    redis_client, key, request_fingerprint, deadline
+                )
+                if record is None:
+                    # Первый запрос упал и снял резерв - выполняем сами
+                    continue
+                if record["fingerprint"] != request_fingerprint:
+                    self.mismatches += 1
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                        detail="Idempotency-Key was used with a different request",
+                    )
+                if record["state"] != DONE:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="Request with this Idempotency-Key is in progress",
+                    )
+                self.replayed += 1
+                return record["body"], True
+        except redis.RedisError as e:
+            logger.error(f"Idempotency check for {key} failed: {e}")
+            self.unavailable += 1
+            return await handler(), False
+
+        self.executed += 1
+        try:
+            body = await handler()
+        except BaseException:
+            await self._release(redis_client, key, token)
+            raise
+        await self._complete(redis_client, key, token, request_fingerprint, body)
+        return body, False
+
+    async def _wait(
+        self,
+        redis_client: redis.Redis,
+        key: str,
+        request_fingerprint: str,
+        deadline: float,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Ждет, пока первый запрос с ключом завершится. Возвращает запись
+        ключа (последнюю увиденную, если время вышло) или None, если
+        резерв снят. Запрос с другим телом не ждет.
+        """
+        self.waited += 1
+        delay = 0.005
+        while True:
+            data = await redis_client.get(key)
+            if data is None:
+                return None
+            record = codec.loads(data)
+            if (
+                record["state"] == DONE
+                or record["fingerprint"] != request_fingerprint
+                or time.monotonic() >= deadline
+            ):
+                return record
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    async def _complete(
+        self,
+        redis_client: redis.Redis,
+        key: str,
+        token: str,
+        request_fingerprint: str,
+        body: Dict[str, Any],
+    ) -> None:
+        record = codec.dumps(
+            {
+                "token": token,
+                "state": DONE,
+                "fingerprint": request_fingerprint,
+                "body": body,
+            }
+        )
+        try:
+            await redis_client.eval(COMPLETE_SCRIPT, 1, key, token, record, self.ttl)
+        except redis.RedisError as e:
+            logger.error(f"Failed to store idempotent response for {key}: {e}")
+
+    async def _release(self, redis_client: redis.Redis, key: str, token: str) -> None:
+        try:
+            await redis_client.eval(RELEASE_SCRIPT, 1, key, token)
+        except redis.RedisError as e:
+            logger.error(f"Failed to release idempotency key {key}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "mismatches": self.mismatches,
+            "unavailable": self.unavailable,
+        }
+
+
+order_idempotency = IdempotencyStore("orders")
@@ -1,11 +1,79 @@
+import asyncio
+import time
+from functools import partial
+from typing import Optional
+
 from aiokafka import AIOKafkaProducer
+from aiokafka.structs import RecordMetadata
+from loguru import logger
+
 from app.core.config import settings
+from app.services.metrics import (
+    dependency_duration,
+    dependency_errors,
+    track_dependency,
+)
+
+# Один продюсер на процесс воркера, создается в lifespan приложения
+_producer: Optional[AIOKafkaProducer] = None
 
 
-async def get_kafka_producer():
-    producer = AIOKafkaProducer(bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS)
-    await producer.start()
-    try:
-        yield producer
-    finally:
+async def start_kafka_producer() -> AIOKafkaProducer:
+    """Создает и запускает общий продюсер Kafka"""
+    global _producer
+    if _producer is None:
+        producer = AIOKafkaProducer(
+            bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+            linger_ms=settings.KAFKA_LINGER_MS,
+            max_batch_size=settings.KAFKA_MAX_BATCH_SIZE,
+            compression_type=settings.KAFKA_COMPRESSION_TYPE,
+            acks=settings.KAFKA_ACKS,
+        )
+        await producer.start()
+        _producer = producer
+    return _producer
+
+
+async def stop_kafka_producer() -> None:
+    """Отправляет накопленные батчи и останавливает продюсер"""
+    global _producer
+    if _producer is not None:
+        producer, _producer = _producer, None
         await producer.stop()
+
+
+async def get_kafka_producer() -> AIOKafkaProducer:
+    if _producer is None:
+        raise RuntimeError("Kafka producer is not started")
+    return _producer
+
+
+def _on_delivery(topic: str, started: float, future) -> None:
+    dependency_duration.labels("kafka", "delivery").observe(
+        time.perf_counter() - started
+    )
+    if future.cancelled():
+        logger.warning(f"Kafka send to {topic} was cancelled")
+        return
+    error = future.exception()
+    if error is not None:
+        dependency_errors.labels("kafka", "delivery").inc()
+        logger.error(f"Error delivering message to Kafka topic {topic}: {error}")
+
+
+async def publish(
+    producer: AIOKafkaProducer,
+    topic: str,
+    value: bytes,
+    key: Optional[bytes] = None,
+) -> "asyncio.Future[RecordMetadata]":
+    """
+    Ставит сообщение в батч продюсера, не дожидаясь подтверждения брокера.
+
+    Возвращает future доставки; время доставки и ошибки учитывает колбэк.
+    """
+    started = time.perf_counter()
+    with track_dependency("kafka", "send"):
+        delivery = await producer.send(topic, value, key=key)
+    delivery.add_done_callback(partial(_on_delivery, topic, started))
+    return delivery
@@ -0,0 +1,114 @@
+"""
+Local cache module - L1 кэш в памяти процесса перед Redis.
+
+Каждый воркер uvicorn держит свой ограниченный LRU с коротким TTL.
+Измененные ключи сбрасываются по сообщению в канале ORDER_CACHE_CHANNEL,
+а TTL ограничивает устаревание, если сообщение потерялось.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import redis.asyncio as redis
+from loguru import logger
+
+from app.core.config import settings
+
+
+class LocalCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        if self._data.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+order_l1_cache = LocalCache(settings.ORDER_L1_CACHE_SIZE, settings.ORDER_L1_CACHE_TTL)
+
+
+async def publish_invalidation(redis_client: redis.Redis, key: str) -> None:
+    """Сбрасывает ключ в своем L1 и рассылает инвалидацию остальным воркерам"""
+    order_l1_cache.invalidate(key)
+    await redis_client.publish(settings.ORDER_CACHE_CHANNEL, key)
+
+
+async def listen_for_invalidations(
+    redis_client: redis.Redis,
+    cache: LocalCache = order_l1_cache,
+    channel: str = settings.ORDER_CACHE_CHANNEL,
+) -> None:
+    """Слушает канал инвалидаций, пока задача не будет отменена"""
+    while True:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(channel)
+            # Пока подписки не было, сообщения могли потеряться
+            cache.clear()
+            while True:
+                # Чтение с таймаутом: блокирующее ожидание упиралось бы
+                # в socket_timeout пула и переподписывалось без причины
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                if message is None:
+                    continue
+                key = message["data"]
+                if isinstance(key, bytes):
+                    key = key.decode("utf-8")
+                cache.invalidate(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Order cache invalidation listener failed: {e}")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
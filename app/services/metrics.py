@@ -0,0 +1,190 @@
+"""
+Metrics module - метрики приложения в формате Prometheus.
+
+MetricsMiddleware считает задержку, число запросов в обработке и статусы
+ответов по шаблону маршрута (например, /orders/{order_id}), а не по
+конкретному пути, и отдает /metrics. Время обращений к Postgres, Redis,
+Kafka и публикации задач Celery пишется в общую гистограмму
+dependency_duration_seconds с метками dependency и operation.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from celery.signals import after_task_publish, before_task_publish
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_PATH = "/metrics"
+
+DEPENDENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route"],
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "Число HTTP-запросов в обработке",
+    ["method"],
+)
+http_responses = Counter(
+    "http_responses_total",
+    "Число HTTP-ответов по статусам",
+    ["method", "route", "status"],
+)
+dependency_duration = Histogram(
+    "dependency_duration_seconds",
+    "Время обращения к внешней зависимости",
+    ["dependency", "operation"],
+    buckets=DEPENDENCY_BUCKETS,
+)
+dependency_errors = Counter(
+    "dependency_errors_total",
+    "Число неудачных обращений к внешней зависимости",
+    ["dependency", "operation"],
+)
+
+
+@contextmanager
+def track_dependency(dependency: str, operation: str) -> Iterator[None]:
+    """Замеряет время блока и считает ошибки"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        dependency_errors.labels(dependency, operation).inc()
+        raise
+    finally:
+        dependency_duration.labels(dependency, operation).observe(
+            time.perf_counter() - start
+        )
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == METRICS_PATH:
+            await self._send_metrics(send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = http_requests_in_progress.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            # Маршрут появляется в scope после роутинга; неизвестные пути
+            # сводятся в одну метку, чтобы не раздувать число серий
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            http_request_duration.labels(method, route_path).observe(elapsed)
+            http_responses.labels(method, route_path, str(status_code)).inc()
+
+    @staticmethod
+    async def _send_metrics(send) -> None:
+        body = generate_latest()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", CONTENT_TYPE_LATEST.encode("latin-1"))],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подписывается на выполнение запросов движка SQLAlchemy"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        dependency_duration.labels("postgres", _statement_kind(statement)).observe(
+            time.perf_counter() - start
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+        dependency_errors.labels(
+            "postgres", _statement_kind(context.statement or "")
+        ).inc()
+
+
+def _statement_kind(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        with track_dependency("redis", "PIPELINE"):
+            return await super().execute(raise_on_error)
+
+
+class InstrumentedRedis(Redis):
+    """Клиент Redis, замеряющий время каждой команды"""
+
+    async def execute_command(self, *args, **options):
+        with track_dependency("redis", str(args[0]).upper()):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+# Время публикации задачи Celery: от сериализации до отправки в брокер
+_task_publish_started: Dict[str, float] = {}
+
+
+@before_task_publish.connect
+def _on_before_task_publish(sender=None, headers=None, **kwargs):
+    if headers and "id" in headers:
+        _task_publish_started[headers["id"]] = time.perf_counter()
+
+
+@after_task_publish.connect
+def _on_after_task_publish(sender=None, headers=None, **kwargs):
+    start = _task_publish_started.pop((headers or {}).get("id"), None)
+    if start is not None:
+        dependency_duration.labels("celery", sender or "unknown").observe(
+            time.perf_counter() - start
+        )
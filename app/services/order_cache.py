@@ -0,0 +1,238 @@
+"""
+Order cache module - владеет ключами order:{id} в Redis и L1 кэшем воркера.
+
+Запись в Redis идет через Lua-скрипт, который сравнивает версии: значение
+с версией не новее закэшированной отбрасывается. Поэтому запоздавшее чтение
+из базы не перезапишет результат более позднего обновления.
+"""
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from uuid import UUID
+
+import redis as sync_redis
+import redis.asyncio as redis
+from loguru import logger
+
+from app.core.config import settings
+from app.services import codec
+from app.services.local_cache import order_l1_cache, publish_invalidation
+from app.services.single_flight import SingleFlight, load_with_lock
+
+SET_IF_NEWER_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local ok, cached = pcall(cjson.decode, current)
+    if ok and type(cached) == 'table'
+            and tonumber(cached['version'] or 0) >= tonumber(ARGV[2]) then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+
+_order_loads = SingleFlight()
+# Объект скрипта на клиента: register_script заново считает SHA1 при каждом вызове
+_scripts: "weakref.WeakKeyDictionary[Any, Any]" = weakref.WeakKeyDictionary()
+
+
+def order_key(order_id: Any) -> str:
+    return f"order:{order_id}"
+
+
+def _encode(order_dict: Dict[str, Any]) -> bytes:
+    return codec.dumps(order_dict)
+
+
+def _set_if_newer_script(redis_client):
+    script = _scripts.get(redis_client)
+    if script is None:
+        script = _scripts[redis_client] = redis_client.register_script(
+            SET_IF_NEWER_SCRIPT
+        )
+    return script
+
+
+async def get_order(
+    redis_client: redis.Redis, order_id: UUID
+) -> Optional[Dict[str, Any]]:
+    """Ищет заказ в L1, затем в Redis"""
+    key = order_key(order_id)
+    order_dict = order_l1_cache.get(key)
+    if order_dict is not None:
+        return order_dict
+
+    cached_order = await redis_client.get(key)
+    if cached_order is None:
+        return None
+    order_dict = codec.loads(cached_order)
+    order_l1_cache.set(key, order_dict)
+    return order_dict
+
+
+async def get_orders(
+    redis_client: redis.Redis, order_ids: Iterable[UUID]
+) -> Dict[str, Dict[str, Any]]:
+    """Возвращает закэшированные заказы по id; промахи L1 добираются одним MGET"""
+    found: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for order_id in order_ids:
+        order_dict = order_l1_cache.get(order_key(order_id))
+        if order_dict is None:
+            missing.append(str(order_id))
+        else:
+            found[str(order_id)] = order_dict
+
+    if missing:
+        values = await redis_client.mget([order_key(order_id) for order_id in missing])
+        for order_id, cached_order in zip(missing, values):
+            if cached_order is not None:
+                order_dict = codec.loads(cached_order)
+                order_l1_cache.set(order_key(order_id), order_dict)
+                found[order_id] = order_dict
+    return found
+
+
+def _set_if_newer(redis_client, order_dict: Dict[str, Any], client=None):
+    script = _set_if_newer_script(redis_client)
+    return script(
+        keys=[order_key(order_dict["id"])],
+        args=[_encode(order_dict), order_dict["version"], settings.ORDER_CACHE_TTL],
+        client=client,
+    )
+
+
+async def store_order(
+    redis_client: redis.Redis, order_dict: Dict[str, Any], changed: bool = False
+) -> None:
+    """
+    Записывает заказ в Redis, если его версия новее закэшированной.
+
+    changed=True означает, что заказ изменился: остальные воркеры
+    получат инвалидацию своего L1.
+    """
+    key = order_key(order_dict["id"])
+    try:
+        stored = await _set_if_newer(redis_client, order_dict)
+        if changed:
+            await publish_invalidation(redis_client, key)
+    except redis.RedisError as e:
+        logger.error(f"Error writing {key} to cache: {e}")
+        return
+    if stored:
+        order_l1_cache.set(key, order_dict)
+
+
+async def store_orders(
+    redis_client: redis.Redis, order_dicts: List[Dict[str, Any]]
+) -> None:
+    """Прогревает кэш пачкой заказов одним пайплайном"""
+    if not order_dicts:
+        return
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for order_dict in order_dicts:
+                await _set_if_newer(redis_client, order_dict, client=pipe)
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.error(f"Error writing {len(order_dicts)} orders to cache: {e}")
+
+
+async def store_changed_orders(
+    redis_client: redis.Redis, order_dicts: List[Dict[str, Any]]
+) -> None:
+    """
+    Записывает пачку измененных заказов и рассылает инвалидацию L1
+    одним пайплайном.
+    """
+    if not order_dicts:
+        return
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for order_dict in order_dicts:
+                key = order_key(order_dict["id"])
+                order_l1_cache.invalidate(key)
+                await _set_if_newer(redis_client, order_dict, client=pipe)
+                await pipe.publish(settings.ORDER_CACHE_CHANNEL, key)
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.error(f"Error writing {len(order_dicts)} orders to cache: {e}")
+
+
+async def get_or_load_order(
+    redis_client: redis.Redis,
+    order_id: UUID,
+    loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает заказ из кэша, а при промахе загружает его через loader.
+
+    Одновременные промахи по одному заказу в воркере выполняют loader
+    один раз. С ORDER_CACHE_DISTRIBUTED_LOCK загрузка схлопывается
+    и между воркерами. loader сам записывает результат в кэш.
+    """
+    order_dict = await get_order(redis_client, order_id)
+    if order_dict is not None:
+        return order_dict
+
+    async def load() -> Optional[Dict[str, Any]]:
+        if not settings.ORDER_CACHE_DISTRIBUTED_LOCK:
+            return await loader()
+        return await load_with_lock(
+            redis_client,
+            f"lock:{order_key(order_id)}",
+            loader,
+            lambda: get_order(redis_client, order_id),
+            settings.ORDER_CACHE_LOCK_TTL_MS,
+            settings.ORDER_CACHE_LOCK_WAIT,
+        )
+
+    return await _order_loads.do(order_key(order_id), load)
+
+
+async def get_or_load_orders(
+    redis_client: redis.Redis,
+    order_ids: List[UUID],
+    loader: Callable[[List[UUID]], Awaitable[List[Dict[str, Any]]]],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Возвращает заказы по id: из L1, затем одним MGET из Redis.
+    Промахи загружаются одним вызовом loader и прогревают кэш пайплайном.
+    """
+    found = await get_orders(redis_client, order_ids)
+    missing = [order_id for order_id in order_ids if str(order_id) not in found]
+    if missing:
+        loaded = await loader(missing)
+        await store_orders(redis_client, loaded)
+        found.update((str(order_dict["id"]), order_dict) for order_dict in loaded)
+    return found
+
+
+def store_changed_orders_sync(
+    redis_client: sync_redis.Redis, order_dicts: List[Dict[str, Any]]
+) -> None:
+    """
+    Записывает измененные заказы из синхронного кода (воркеры Celery)
+    и рассылает инвалидацию L1 одним пайплайном.
+    """
+    if not order_dicts:
+        return
+    script = _set_if_newer_script(redis_client)
+    try:
+        with redis_client.pipeline(transaction=False) as pipe:
+            for order_dict in order_dicts:
+                key = order_key(order_dict["id"])
+                script(
+                    keys=[key],
+                    args=[
+                        _encode(order_dict),
+                        order_dict["version"],
+                        settings.ORDER_CACHE_TTL,
+                    ],
+                    client=pipe,
+                )
+                pipe.publish(settings.ORDER_CACHE_CHANNEL, key)
+            pipe.execute()
+    except sync_redis.RedisError as e:
+        logger.error(f"Error writing {len(order_dicts)} orders to cache: {e}")
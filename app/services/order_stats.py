@@ -0,0 +1,232 @@
+"""
+Order stats module - сводка заказов пользователя в таблице user_order_stats.
+
+Сводка меняется инкрементально в той же транзакции, что и сами заказы:
+при создании заказов и при смене статуса выполняется один
+INSERT ... ON CONFLICT DO UPDATE, прибавляющий дельты по всем затронутым
+пользователям. Поэтому чтение сводки - это выборка одной строки по ключу.
+
+Пересчет с нуля (например, после первого деплоя):
+    python -m app.services.order_stats backfill
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.database.db import engine
+from app.models.order_stats import UserOrderStats
+from app.models.orders import OrderStatus, Orders
+
+STATUS_COLUMNS = {
+    OrderStatus.PENDING: "pending_count",
+    OrderStatus.PAID: "paid_count",
+    OrderStatus.SHIPPED: "shipped_count",
+    OrderStatus.CANCELED: "canceled_count",
+}
+COUNTER_COLUMNS = ("orders_count", *STATUS_COLUMNS.values(), "total_spent")
+
+# (user_id, старый статус, новый статус, сумма заказа)
+Transition = Tuple[int, OrderStatus, OrderStatus, float]
+
+
+def _spent(status: OrderStatus, price: float) -> float:
+    return 0.0 if status == OrderStatus.CANCELED else price
+
+
+def _empty_delta() -> Dict[str, Any]:
+    delta: Dict[str, Any] = dict.fromkeys(COUNTER_COLUMNS, 0)
+    delta["last_order_at"] = None
+    return delta
+
+
+def created_deltas(rows: Iterable[Any]) -> Dict[int, Dict[str, Any]]:
+    """Дельты сводки для только что вставленных заказов"""
+    deltas: Dict[int, Dict[str, Any]] = defaultdict(_empty_delta)
+    for row in rows:
+        delta = deltas[row.user_id]
+        delta["orders_count"] += 1
+        delta[STATUS_COLUMNS[row.status]] += 1
+        delta["total_spent"] += _spent(row.status, row.total_price)
+        last_order_at = delta["last_order_at"]
+        if last_order_at is None or row.created_at > last_order_at:
+            delta["last_order_at"] = row.created_at
+    return deltas
+
+
+def transition_deltas(
+    transitions: Iterable[Transition],
+) -> Dict[int, Dict[str, Any]]:
+    """Дельты сводки для смены статусов"""
+    deltas: Dict[int, Dict[str, Any]] = defaultdict(_empty_delta)
+    for user_id, old, new, price in transitions:
+        if old == new:
+            continue
+        delta = deltas[user_id]
+        delta[STATUS_COLUMNS[old]] -= 1
+        delta[STATUS_COLUMNS[new]] += 1
+        delta["total_spent"] += _spent(new, price) - _spent(old, price)
+    return deltas
+
+
+def stats_upsert(dialect_name: str, deltas: Dict[int, Dict[str, Any]]):
+    """
+    Один INSERT ... ON CONFLICT DO UPDATE, прибавляющий дельты ко всем
+    пользователям сразу. Возвращает None, если писать нечего.
+    """
+    if not deltas:
+        return None
+    dialect = sqlite if dialect_name == "sqlite" else postgresql
+    table = UserOrderStats.__table__
+    stmt = dialect.insert(table).values(
+        [{"user_id": user_id, **delta} for user_id, delta in sorted(deltas.items())]
+    )
+    excluded = stmt.excluded
+    set_ = {column: table.c[column] + excluded[column] for column in COUNTER_COLUMNS}
+    set_["last_order_at"] = case(
+        (
+            or_(
+                table.c.last_order_at.is_(None),
+                excluded.last_order_at > table.c.last_order_at,
+            ),
+            excluded.last_order_at,
+        ),
+        else_=table.c.last_order_at,
+    )
+    return stmt.on_conflict_do_update(index_elements=[table.c.user_id], set_=set_)
+
+
+async def record_created(db: AsyncSession, rows: Iterable[Any]) -> None:
+    stmt = stats_upsert(db.get_bind().dialect.name, created_deltas(rows))
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+async def record_transitions(
+    db: AsyncSession, transitions: Iterable[Transition]
+) -> None:
+    stmt = stats_upsert(db.get_bind().dialect.name, transition_deltas(transitions))
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+def stats_to_dict(user_id: int, stats: Optional[UserOrderStats]) -> Dict[str, Any]:
+    """Сериализует сводку; у пользователя без заказов все счетчики нулевые"""
+    result: Dict[str, Any] = {"user_id": user_id}
+    for column in COUNTER_COLUMNS:
+        result[column] = getattr(stats, column) if stats is not None else 0
+    result["last_order_at"] = stats.last_order_at if stats is not None else None
+    return result
+
+
+def lock_statement(dialect_name: str, first_user: int, last_user: int):
+    """
+    Создает недостающие строки сводки пользователей из диапазона, у которых
+    есть заказы, и блокирует их до конца транзакции. Возвращает их user_id.
+    """
+    dialect = sqlite if dialect_name == "sqlite" else postgresql
+    table = UserOrderStats.__table__
+    users = (
+        select(Orders.user_id)
+        .where(Orders.user_id.between(first_user, last_user))
+        .distinct()
+        .order_by(Orders.user_id)
+    )
+    stmt = dialect.insert(table).from_select(["user_id"], users)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={"user_id": stmt.excluded.user_id},
+    ).returning(table.c.user_id)
+
+
+def backfill_statement(dialect_name: str, user_ids: List[int]):
+    """Пересчитывает сводку пользователей по таблице orders"""
+    dialect = sqlite if dialect_name == "sqlite" else postgresql
+    table = UserOrderStats.__table__
+    aggregates = (
+        select(
+            Orders.user_id,
+            func.count().label("orders_count"),
+            *(
+                func.count().filter(Orders.status == status).label(column)
+                for status, column in STATUS_COLUMNS.items()
+            ),
+            func.coalesce(
+                func.sum(Orders.total_price).filter(
+                    Orders.status != OrderStatus.CANCELED
+                ),
+                0.0,
+            ).label("total_spent"),
+            func.max(Orders.created_at).label("last_order_at"),
+        )
+        .where(Orders.user_id.in_(user_ids))
+        .group_by(Orders.user_id)
+    )
+    columns = ["user_id", *COUNTER_COLUMNS, "last_order_at"]
+    stmt = dialect.insert(table).from_select(columns, aggregates)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={column: stmt.excluded[column] for column in columns[1:]},
+    )
+
+
+async def backfill(engine: AsyncEngine, batch_users: int = 1000) -> int:
+    """
+    Пересчитывает сводку всех пользователей диапазонами по user_id.
+
+    Перед пересчетом диапазона его строки сводки блокируются upsert'ом,
+    как при записи заказов; запись заказов других пользователей не ждет.
+    Транзакция заказа, уже взявшая строку, закоммитится до пересчета
+    и попадет в агрегат; начатая позже ждет пересчета и прибавит свою
+    дельту к нему. Пользователи, чей первый заказ появился после
+    блокировки, не пересчитываются: их сводку с нуля ведут дельты.
+
+    Пересчет видит только заказы, оставшиеся в orders: заказы из партиций,
+    выгруженных app.database.partitions archive, выпадут из счетчиков
+    и total_spent пересчитанных пользователей.
+    """
+    async with engine.connect() as conn:
+        bounds = (
+            await conn.execute(
+                select(func.min(Orders.user_id), func.max(Orders.user_id))
+            )
+        ).one()
+    if bounds[0] is None:
+        return 0
+
+    updated = 0
+    dialect_name = engine.dialect.name
+    for first_user in range(bounds[0], bounds[1] + 1, batch_users):
+        last_user = first_user + batch_users - 1
+        async with engine.begin() as conn:
+            user_ids = (
+                await conn.scalars(lock_statement(dialect_name, first_user, last_user))
+            ).all()
+            if not user_ids:
+                continue
+            result = await conn.execute(backfill_statement(dialect_name, user_ids))
+            updated += result.rowcount
+        logger.info(f"Order stats backfilled for users {first_user}..{last_user}")
+    return updated
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="User order stats")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-users", type=int, default=1000)
+    args = parser.parse_args()
+
+    try:
+        updated = await backfill(engine, args.batch_users)
+    finally:
+        await engine.dispose()
+    logger.info(f"Order stats backfilled for {updated} users")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
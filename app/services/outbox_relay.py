@@ -0,0 +1,102 @@
+"""
+Outbox relay - переносит события заказов из таблицы order_outbox в Kafka.
+
+Строки выбираются через SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько
+релеев могут работать параллельно, не забирая одни и те же события.
+Строка удаляется только после подтверждения брокера (at-least-once).
+
+Запуск отдельным процессом: python -m app.services.outbox_relay
+"""
+import asyncio
+
+from loguru import logger
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.database.db import async_session_maker
+from app.models.outbox import OrderOutbox
+from app.services import codec
+from app.services.kafka_service import (
+    get_kafka_producer,
+    publish,
+    start_kafka_producer,
+    stop_kafka_producer,
+)
+from app.services.metrics import track_dependency
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        session_maker=async_session_maker,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL,
+    ):
+        self._session_maker = session_maker
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+
+    async def drain_once(self) -> int:
+        """Отправляет один батч событий и возвращает их количество"""
+        producer = await get_kafka_producer()
+        async with self._session_maker() as session:
+            async with session.begin():
+                result = await session.execute(
+                    select(
+                        OrderOutbox.id,
+                        OrderOutbox.topic,
+                        OrderOutbox.key,
+                        OrderOutbox.payload,
+                    )
+                    .order_by(OrderOutbox.id)
+                    .limit(self._batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                rows = result.all()
+                if not rows:
+                    return 0
+
+                with track_dependency("kafka", "relay_batch"):
+                    deliveries = [
+                        await publish(
+                            producer,
+                            row.topic,
+                            codec.dumps(row.payload),
+                            key=row.key.encode("utf-8") if row.key else None,
+                        )
+                        for row in rows
+                    ]
+                    await asyncio.gather(*deliveries)
+
+                await session.execute(
+                    delete(OrderOutbox).where(
+                        OrderOutbox.id.in_([row.id for row in rows])
+                    )
+                )
+        return len(rows)
+
+    async def run(self) -> None:
+        """Опрашивает outbox, пока задача не будет отменена"""
+        while True:
+            try:
+                sent = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error relaying order outbox: {e}")
+                sent = 0
+
+            if sent < self._batch_size:
+                await asyncio.sleep(self._poll_interval)
+
+
+async def main() -> None:
+    await start_kafka_producer()
+    try:
+        await OutboxRelay().run()
+    finally:
+        await stop_kafka_producer()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
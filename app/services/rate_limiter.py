@@ -0,0 +1,184 @@
+"""
+Rate limiter module - гибридный ограничитель запросов: локально и в Redis.
+
+Точный путь - атомарный Lua-скрипт скользящего окна (взвешенные счетчики
+текущего и предыдущего окна), один round-trip на запрос. Поверх него каждый
+воркер держит локальное ведро токенов на ключ: после синхронизации с Redis
+в него кладется доля оставшегося лимита, и пока ведро не пусто, запросы
+пропускаются без обращения к Redis. Локально пропущенные запросы
+досылаются в Redis при следующем точном запросе или фоновой сверке.
+"""
+import asyncio
+import math
+import time
+from contextlib import suppress
+from typing import Dict, Optional
+
+import redis.asyncio as redis
+from fastapi import HTTPException, Request, status
+from loguru import logger
+
+from app.core.config import settings
+
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local forced = tonumber(ARGV[4])
+local checked = tonumber(ARGV[5])
+
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local count = previous * (window - elapsed) / window + current + forced
+
+local allowed = 1
+if checked > 0 and count + checked > limit then
+    allowed = 0
+    checked = 0
+end
+local hits = forced + checked
+if hits > 0 then
+    redis.call('INCRBY', KEYS[1], hits)
+    redis.call('PEXPIRE', KEYS[1], window * 2)
+end
+
+local retry_after = 0
+if allowed == 0 then
+    retry_after = window - elapsed
+end
+return {allowed, math.ceil(count + checked), retry_after}
+"""
+
+
+class _LocalBucket:
+    __slots__ = ("tokens", "pending", "synced_at")
+
+    def __init__(self):
+        self.tokens = 0
+        self.pending = 0
+        self.synced_at = 0.0
+
+
+class _Limiter:
+    def __init__(self):
+        self.redis: Optional[redis.Redis] = None
+        self.script = None
+        self.buckets: Dict[str, "tuple[RateLimiter, _LocalBucket]"] = {}
+        self.local_hits = 0
+        self.redis_hits = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def init(self, redis_client: redis.Redis) -> None:
+        self.redis = redis_client
+        self.script = redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+        self._task = asyncio.create_task(self._reconcile_forever())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.reconcile()
+
+    async def reconcile(self) -> None:
+        """Досылает локально пропущенные запросы и обновляет ведра"""
+        now = time.monotonic()
+        for key, (limiter, bucket) in list(self.buckets.items()):
+            if bucket.pending:
+                await limiter.sync(key, bucket, checked=0)
+            elif now - bucket.synced_at > limiter.window_ms / 1000:
+                del self.buckets[key]
+
+    async def _reconcile_forever(self) -> None:
+        while True:
+            await asyncio.sleep(settings.RATE_LIMIT_SYNC_INTERVAL)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Rate limiter reconciliation failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "keys": len(self.buckets),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+        }
+
+
+limiter_state = _Limiter()
+
+
+async def default_identifier(request: Request) -> str:
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded:
+        return forwarded.split(",")[0] + ":" + request.scope["path"]
+    return request.client.host + ":" + request.scope["path"]
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        times: int = 1,
+        milliseconds: int = 0,
+        seconds: int = 0,
+        minutes: int = 0,
+        hours: int = 0,
+        identifier=default_identifier,
+    ):
+        self.times = times
+        self.window_ms = (
+            milliseconds + 1000 * seconds + 60000 * minutes + 3600000 * hours
+        )
+        self.identifier = identifier
+
+    async def __call__(self, request: Request) -> None:
+        key = (
+            f"{settings.RATE_LIMIT_PREFIX}:{await self.identifier(request)}"
+            f":{self.times}:{self.window_ms}"
+        )
+        entry = limiter_state.buckets.get(key)
+        if entry is None:
+            entry = limiter_state.buckets[key] = (self, _LocalBucket())
+        bucket = entry[1]
+
+        synced_ago = time.monotonic() - bucket.synced_at
+        if synced_ago < settings.RATE_LIMIT_SYNC_INTERVAL and bucket.tokens > 0:
+            bucket.tokens -= 1
+            bucket.pending += 1
+            limiter_state.local_hits += 1
+            return
+
+        retry_after_ms = await self.sync(key, bucket, checked=1)
+        if retry_after_ms:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too Many Requests",
+                headers={"Retry-After": str(math.ceil(retry_after_ms / 1000))},
+            )
+
+    async def sync(self, key: str, bucket: _LocalBucket, checked: int) -> int:
+        """
+        Выполняет точную проверку в Redis, досылая накопленные локальные
+        запросы. Возвращает задержку до повтора в мс, 0 - если запрос разрешен.
+        """
+        now_ms = int(time.time() * 1000)
+        window_index, elapsed = divmod(now_ms, self.window_ms)
+        forced, bucket.pending = bucket.pending, 0
+        try:
+            allowed, count, retry_after_ms = await limiter_state.script(
+                keys=[f"{key}:{window_index}", f"{key}:{window_index - 1}"],
+                args=[self.times, self.window_ms, elapsed, forced, checked],
+            )
+        except redis.RedisError as e:
+            # Недоступность Redis не должна останавливать API
+            bucket.pending += forced
+            logger.error(f"Rate limiter check failed for {key}: {e}")
+            return 0
+
+        limiter_state.redis_hits += 1
+        bucket.tokens = int(
+            max(self.times - count, 0) * settings.RATE_LIMIT_LOCAL_SHARE
+        )
+        bucket.synced_at = time.monotonic()
+        return 0 if allowed else retry_after_ms
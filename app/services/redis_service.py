@@ -1,10 +1,59 @@
+"""
+Redis service - общий клиент Redis на процесс воркера.
+
+Клиент и пул соединений создаются в lifespan приложения и отдаются
+зависимостью get_redis, поэтому запросы, ограничитель и слушатель
+инвалидаций берут соединения из одного пула. Пул блокирующий: при
+исчерпании max_connections запрос ждет свободное соединение до
+REDIS_POOL_TIMEOUT, а не открывает новое.
+"""
+from typing import Any, Dict, Optional
+
 import redis.asyncio as redis
+
 from app.core.config import settings
+from app.services.metrics import InstrumentedRedis
+
+_client: Optional[InstrumentedRedis] = None
+
+
+async def start_redis() -> InstrumentedRedis:
+    """Создает общий пул соединений и клиент Redis"""
+    global _client
+    if _client is None:
+        pool = redis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            socket_keepalive=True,
+        )
+        _client = InstrumentedRedis.from_pool(pool)
+    return _client
+
+
+async def stop_redis() -> None:
+    """Закрывает клиент и все соединения пула"""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+async def get_redis() -> InstrumentedRedis:
+    if _client is None:
+        raise RuntimeError("Redis client is not started")
+    return _client
 
 
-async def get_redis():
-    try:
-        redis_client = redis.from_url(settings.REDIS_URL)
-        yield redis_client
-    finally:
-        await redis_client.close()
+def pool_stats() -> Dict[str, Any]:
+    if _client is None:
+        return {}
+    pool = _client.connection_pool
+    return {
+        "max_connections": pool.max_connections,
+        "in_use": len(pool._in_use_connections),
+        "available": len(pool._available_connections),
+    }
@@ -0,0 +1,97 @@
+"""
+Single flight module - схлопывание одновременных загрузок одного ключа.
+
+SingleFlight работает внутри воркера: первый запрос выполняет загрузку,
+остальные ждут его результат. load_with_lock дополнительно координирует
+воркеры через блокировку в Redis.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+from uuid import uuid4
+
+import redis.asyncio as redis
+
+T = TypeVar("T")
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        """Выполняет loader один раз на ключ для всех одновременных вызовов"""
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Ведущий запрос отменили - пробуем загрузить сами
+                if future.cancelled():
+                    continue
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Ожидающих может не быть, исключение считаем полученным
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+
+async def load_with_lock(
+    redis_client: redis.Redis,
+    lock_key: str,
+    loader: Callable[[], Awaitable[T]],
+    read_cached: Callable[[], Awaitable[Optional[T]]],
+    lock_ttl_ms: int,
+    wait_timeout: float,
+) -> Optional[T]:
+    """
+    Загружает значение под блокировкой SET NX в Redis.
+
+    Не получившие блокировку ждут, пока владелец заполнит кэш. Если время
+    ожидания вышло или блокировка исчезла без результата, грузят сами.
+    """
+    token = uuid4().hex
+    if await redis_client.set(lock_key, token, nx=True, px=lock_ttl_ms):
+        try:
+            return await loader()
+        finally:
+            await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    deadline = time.monotonic() + wait_timeout
+    delay = 0.005
+    while time.monotonic() < deadline:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.1)
+        cached = await read_cached()
+        if cached is not None:
+            return cached
+        if not await redis_client.exists(lock_key):
+            break
+    return await loader()
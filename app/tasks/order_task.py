@@ -1,18 +1,153 @@
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
 from celery import Celery
+from celery.signals import worker_process_init
+from loguru import logger
+import redis
+from sqlalchemy import Engine, Uuid, any_, bindparam, create_engine, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+
 from app.core.config import settings
-import time
+from app.database.db import SYNC_DATABASE_URL
+from app.database.partitions import ensure_partitions
+from app.models.orders import OrderStatus, Orders
+from app.orders.crud import order_to_dict
+from app.orders.ids import created_at_filter
+from app.services import codec
+from app.services.order_cache import store_changed_orders_sync
+from app.services.order_stats import stats_upsert, transition_deltas
 
 # Создаем объект Celery
-celery_app = Celery(
-    "orders", broker=settings.CELERY_BROKER_URL, backend=settings.CELERY_RESULT_BACKEND
-)
+celery_app = Celery("orders")
+celery_app.config_from_object("app.core.celery_config")
+
+# Обработка переводит новый заказ в оплаченный; ставится в очередь
+# только с ORDER_AUTO_PAY_ENABLED
+PROCESSING_TRANSITIONS = {OrderStatus.PENDING: OrderStatus.PAID}
+
+# Пул соединений и клиент Redis создаются один раз на процесс воркера
+_engine: Optional[Engine] = None
+_redis_client: Optional[redis.Redis] = None
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs) -> None:
+    # Соединения родительского процесса нельзя использовать после fork
+    global _engine, _redis_client
+    _engine = None
+    _redis_client = None
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        from gevent import monkey
+
+        if monkey.is_module_patched("socket"):
+            # В пуле gevent psycopg2 должен отдавать управление при ожидании I/O
+            from psycogreen.gevent import patch_psycopg
+
+            patch_psycopg()
+        _engine = create_engine(
+            SYNC_DATABASE_URL,
+            pool_size=settings.CELERY_DB_POOL_SIZE,
+            max_overflow=settings.CELERY_DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+            json_serializer=codec.dumps_str,
+            json_deserializer=codec.loads,
+        )
+    return _engine
+
+
+def get_redis_client() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
 
-# Настройка логирования
-celery_app.conf.task_track_started = True
-celery_app.conf.task_send_sent_event = True
+
+def _advance(statement, current: OrderStatus) -> List[Dict[str, Any]]:
+    with get_engine().begin() as conn:
+        rows = conn.execute(statement).all()
+        stats = stats_upsert(
+            conn.dialect.name,
+            transition_deltas(
+                (row.user_id, current, row.status, row.total_price) for row in rows
+            ),
+        )
+        if stats is not None:
+            conn.execute(stats)
+    orders = [order_to_dict(row) for row in rows]
+    store_changed_orders_sync(get_redis_client(), orders)
+    return orders
+
+
+def advance_orders(order_ids: List[str]) -> List[Dict[str, Any]]:
+    """Переводит заказы по таблице переходов одним UPDATE ... WHERE id = ANY(...)"""
+    ids = [UUID(order_id) for order_id in order_ids]
+    changed: List[Dict[str, Any]] = []
+    for current, target in PROCESSING_TRANSITIONS.items():
+        changed += _advance(
+            update(Orders)
+            .where(
+                Orders.id == any_(bindparam("ids", ids, type_=ARRAY(Uuid))),
+                *created_at_filter(ids),
+                Orders.status == current,
+            )
+            .values(status=target, version=Orders.version + 1)
+            .returning(*Orders.__table__.c),
+            current,
+        )
+    return changed
 
 
 @celery_app.task
 def process_order(order_id):
-    time.sleep(2)
-    print(f"Order {order_id} processed")
+    orders = advance_orders([order_id])
+    logger.info(f"Order {order_id} processed, {len(orders)} updated")
+
+
+@celery_app.task
+def process_orders_batch(order_ids: List[str]):
+    orders = advance_orders(order_ids)
+    logger.info(f"Processed batch of {len(order_ids)} orders, {len(orders)} updated")
+
+
+@celery_app.task
+def sweep_pending_orders():
+    """
+    Подбирает заказы, пропущенные обработкой, пачкой по индексу активных
+    статусов. Выключена, пока не задан ORDER_AUTO_PAY_ENABLED:
+    иначе каждый PENDING заказ становится PAID через несколько секунд,
+    и клиент не успевает сам перевести его.
+    """
+    if not settings.ORDER_AUTO_PAY_ENABLED:
+        return
+    changed = 0
+    for current, target in PROCESSING_TRANSITIONS.items():
+        pending = (
+            select(Orders.id)
+            .where(Orders.status == current)
+            .order_by(Orders.created_at)
+            .limit(settings.ORDER_PROCESSING_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        changed += len(
+            _advance(
+                update(Orders)
+                .where(Orders.id.in_(pending))
+                .values(status=target, version=Orders.version + 1)
+                .returning(*Orders.__table__.c),
+                current,
+            )
+        )
+    if changed:
+        logger.info(f"Swept {changed} pending orders")
+
+
+@celery_app.task
+def maintain_order_partitions():
+    """Создает месячные партиции orders на ORDERS_PARTITION_PREMAKE_MONTHS вперед"""
+    with get_engine().begin() as conn:
+        ensure_partitions(conn)
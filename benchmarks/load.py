@@ -0,0 +1,259 @@
+"""
+Load benchmark - нагрузочный прогон эндпоинтов заказов внутри процесса.
+
+Приложение FastAPI вызывается напрямую через ASGI-транспорт httpx, без сети.
+Внешние зависимости заменены локальными: база - SQLite во временном файле
+(или переданный --database-url, например одноразовый Postgres), Redis -
+fakeredis, брокер Celery - memory://, события Kafka остаются в outbox.
+Ограничители запросов отключены, чтобы замерять сами эндпоинты.
+
+Запуск из корня репозитория (или с ним в PYTHONPATH), подробнее в README:
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.load --requests 2000 --concurrency 32
+    python -m benchmarks.load --database-url postgresql+asyncpg://... --output run.json
+    python -m benchmarks.load --coalesce  # пакетная вставка create_order
+
+Печатает JSON-отчет: пропускная способность и p50/p95/p99 по каждому
+эндпоинту, а также параметры прогона, чтобы результаты можно было сравнивать.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+Request = Callable[[Any, int], Awaitable[Any]]
+
+
+def configure_environment(database_url: str, coalesce: bool) -> None:
+    """Настраивает Settings до импорта приложения"""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["ORDERS_COALESCE_ENABLED"] = str(coalesce).lower()
+    os.environ["OUTBOX_RELAY_ENABLED"] = "false"
+    os.environ["CELERY_BROKER_URL"] = "memory://"
+    os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production")
+
+
+def summarize(
+    name: str, latencies: List[float], errors: int, elapsed: float
+) -> Dict[str, Any]:
+    ms = sorted(latency * 1000 for latency in latencies)
+    percentiles = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "endpoint": name,
+        "requests": len(ms),
+        "errors": errors,
+        "throughput_rps": round(len(ms) / elapsed, 1),
+        "p50_ms": round(percentiles[49], 3),
+        "p95_ms": round(percentiles[94], 3),
+        "p99_ms": round(percentiles[98], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+async def drive(
+    name: str, client, request: Request, total: int, concurrency: int
+) -> Dict[str, Any]:
+    """Выполняет total запросов, держа в работе не более concurrency"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            response = await request(client, index)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, errors, time.perf_counter() - started)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import fakeredis.aioredis
+    import httpx
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.auth import auth, register
+    from app.auth.auth import create_access_token
+    from app.database.db import Base
+    from app.database.partitions import ensure_partitions
+    from app.database.db_depends import get_db, get_user_read_db
+    from app.main import app
+    from app.models.users import Users
+    from app.orders import order
+    from app.orders.coalescer import order_coalescer
+    from app.services.rate_limiter import RateLimiter
+    from app.services.redis_service import get_redis
+    from app.tasks.order_task import celery_app
+
+    celery_app.conf.broker_url = "memory://"
+
+    # SQLite допускает одного писателя: ждем блокировку, а не падаем сразу
+    connect_args = {"timeout": 30} if args.database_url.startswith("sqlite") else {}
+    engine = create_async_engine(args.database_url, connect_args=connect_args)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # В Postgres orders партиционирована, заказам нужна партиция месяца
+        await conn.run_sync(ensure_partitions)
+        user_id = (
+            await conn.execute(
+                insert(Users)
+                .values(email=f"load-{time.time_ns()}@example.com", password="load")
+                .returning(Users.id)
+            )
+        ).scalar_one()
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    redis_client = fakeredis.aioredis.FakeRedis()
+
+    async def bench_db():
+        async with session_maker() as session:
+            yield session
+
+    async def bench_redis():
+        yield redis_client
+
+    async def no_rate_limit():
+        pass
+
+    app.dependency_overrides[get_db] = bench_db
+    app.dependency_overrides[get_user_read_db] = bench_db
+    app.dependency_overrides[order.get_current_user_read_db] = bench_db
+    app.dependency_overrides[get_redis] = bench_redis
+    for router in (auth.router, register.router, order.router):
+        for route in router.routes:
+            for dependency in route.dependencies:
+                if isinstance(dependency.dependency, RateLimiter):
+                    app.dependency_overrides[dependency.dependency] = no_rate_limit
+
+    token = create_access_token({"sub": f"load-{user_id}", "id": user_id})
+    rng = random.Random(args.seed)
+    order_ids: List[str] = []
+
+    async def create_order(client, index):
+        response = await client.post(
+            "/orders/",
+            json={
+                "items": [{"sku": f"SKU-{rng.randrange(5000)}", "qty": 1 + index % 3}],
+                "total_price": round(rng.uniform(1, 500), 2),
+            },
+        )
+        if response.status_code == 201:
+            order_ids.append(response.json()["id"])
+        return response
+
+    async def get_order(client, index):
+        return await client.get(f"/orders/{rng.choice(order_ids)}")
+
+    # Переходы ограничены ORDER_STATUS_TRANSITIONS: одиночные обновления
+    # оплачивают заказы по очереди, пакетные отгружают оплаченные пачками
+    updates = itertools.count()
+    shipments = itertools.count()
+
+    async def update_product(client, index):
+        order_id = order_ids[next(updates) % len(order_ids)]
+        return await client.put(f"/orders/{order_id}", json={"status": "PAID"})
+
+    async def update_orders_status(client, index):
+        start = next(shipments) * args.bulk_size % len(order_ids)
+        return await client.put(
+            "/orders/status",
+            json={
+                "order_ids": order_ids[start:start + args.bulk_size],
+                "status": "SHIPPED",
+            },
+        )
+
+    async def get_orders_for_user(client, index):
+        return await client.get(f"/orders/user/{user_id}/", params={"limit": 50})
+
+    # Ошибки приложения считаются ответами 500, а не прерывают прогон
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    results = []
+    try:
+        async with httpx.AsyncClient(
+            transport=transport,
+            base_url="http://bench",
+            headers={"Authorization": f"Bearer {token}"},
+        ) as client:
+            for name, request in (
+                ("create_order", create_order),
+                ("get_order", get_order),
+                ("update_product", update_product),
+                ("update_orders_status", update_orders_status),
+                ("get_orders_for_user", get_orders_for_user),
+            ):
+                if args.warmup:
+                    await drive(name, client, request, args.warmup, args.concurrency)
+                results.append(
+                    await drive(
+                        name, client, request, args.requests, args.concurrency
+                    )
+                )
+    finally:
+        await order_coalescer.close()
+        app.dependency_overrides.clear()
+        await redis_client.aclose()
+        await engine.dispose()
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "database": engine.dialect.name,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "warmup": args.warmup,
+        "seed": args.seed,
+        "bulk_size": args.bulk_size,
+        "coalesce": args.coalesce,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load benchmark")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--bulk-size", type=int, default=50, help="заказов в PUT /orders/status"
+    )
+    parser.add_argument("--output", default=None)
+    parser.add_argument(
+        "--coalesce", action="store_true", help="включить ORDERS_COALESCE_ENABLED"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.database_url is None:
+            args.database_url = f"sqlite+aiosqlite:///{tmp}/load.db"
+        configure_environment(args.database_url, args.coalesce)
+        report = asyncio.run(run(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    if any(item["errors"] for item in report["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
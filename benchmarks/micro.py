@@ -0,0 +1,77 @@
+"""
+Micro benchmark - замеры горячих функций без базы и сети.
+
+Каждый сценарий выполняется серией повторов через timeit, в отчет попадают
+медиана и лучший результат на один вызов, чтобы сравнивать прогоны.
+
+Внешние сервисы не нужны. Запуск из корня репозитория (или с ним
+в PYTHONPATH), подробнее в README:
+    python -m benchmarks.micro --number 20000 --repeat 7
+"""
+import argparse
+import json
+import os
+import statistics
+import timeit
+from datetime import datetime
+from typing import Any, Callable, Dict
+from uuid import uuid4
+
+
+def build_cases() -> Dict[str, Callable[[], Any]]:
+    from app.auth.auth import _verify_token, create_access_token
+    from app.orders.pagination import decode_cursor, encode_cursor
+    from app.services import codec
+    from app.services.local_cache import LocalCache
+
+    order = {
+        "id": str(uuid4()),
+        "user_id": 1,
+        "items": [{"sku": f"SKU-{i}", "qty": 1} for i in range(5)],
+        "total_price": 123.45,
+        "status": "PENDING",
+        "created_at": datetime.utcnow(),
+        "version": 1,
+    }
+    encoded = codec.dumps(order)
+    cache = LocalCache(10_000, 60.0)
+    for i in range(10_000):
+        cache.set(f"order:{i}", order)
+    token = create_access_token({"sub": "micro@example.com", "id": 1})
+    cursor = encode_cursor(order["created_at"], uuid4())
+
+    return {
+        "codec.dumps(order)": lambda: codec.dumps(order),
+        "codec.loads(order)": lambda: codec.loads(encoded),
+        "local_cache.get(hit)": lambda: cache.get("order:5000"),
+        "local_cache.set": lambda: cache.set("order:5000", order),
+        "jwt.verify": lambda: _verify_token(token),
+        "cursor.decode": lambda: decode_cursor(cursor),
+    }
+
+
+def run(number: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    report = {}
+    for name, case in build_cases().items():
+        timings = timeit.repeat(case, number=number, repeat=repeat)
+        per_call = [timing / number * 1e6 for timing in timings]
+        report[name] = {
+            "median_us": round(statistics.median(per_call), 3),
+            "best_us": round(min(per_call), 3),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro benchmark")
+    parser.add_argument("--number", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+    # Движок базы создается при импорте приложения, но не подключается
+    os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production")
+    print(json.dumps(run(args.number, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Query plans benchmark - проверка планов запросов эндпоинтов заказов.
+
+Заполняет локальный Postgres миллионами заказов, выполняет EXPLAIN ANALYZE
+для запросов каждого эндпоинта и проверяет, что ни один из них
+не сканирует таблицу orders последовательно. В отчете видно, какие
+партиции orders затрагивает каждый запрос.
+
+Нужен Postgres с примененными миграциями (alembic upgrade head).
+Модели приложения читают настройки базы при импорте, поэтому DATABASE_URL
+нужен и при --database-url. Запуск из корня репозитория (или с ним
+в PYTHONPATH), подробнее в README:
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --skip-seed  # данные уже заполнены
+
+Печатает JSON-отчет и завершается с кодом 1, если план деградировал.
+Не запускайте на production-базе: сид добавляет тестовых пользователей
+и заказы, DML-запросы объясняются в откатываемых транзакциях.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import literal_column, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from app.models.orders import OrderStatus, Orders
+from app.orders.crud import transition_statement
+from app.orders.ids import created_at_filter
+from app.orders.pagination import encode_cursor, paginate
+
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+SEED_USERS = """
+INSERT INTO users (email, password)
+SELECT 'bench-' || g || '@example.com', 'bench'
+FROM generate_series(1, :users) AS g
+ON CONFLICT (email) DO NOTHING
+"""
+
+# Каждый десятый заказ принадлежит одному "тяжелому" пользователю,
+# активны только самые свежие заказы, как в реальной таблице
+SEED_ORDERS = """
+INSERT INTO orders (id, user_id, items, total_price, status, created_at)
+SELECT
+    -- UUIDv7 с меткой created_at, как у заказов, созданных через API
+    encode(
+        set_bit(
+            set_bit(
+                overlay(
+                    uuid_send(gen_random_uuid())
+                    PLACING substring(
+                        int8send(floor(extract(epoch FROM created_at) * 1000)::bigint)
+                        FROM 3
+                    )
+                    FROM 1 FOR 6
+                ),
+                52, 1
+            ),
+            53, 1
+        ),
+        'hex'
+    )::uuid,
+    CASE WHEN g % 10 = 0 THEN :first_user
+         ELSE :first_user + 1 + g % (:users - 1) END,
+    jsonb_build_array(jsonb_build_object('sku', 'SKU-' || g % 5000, 'qty', 1 + g % 3)),
+    round((random() * 500)::numeric, 2),
+    (CASE WHEN g <= :orders / 100 THEN
+              CASE WHEN g % 2 = 0 THEN 'PENDING' ELSE 'PAID' END
+          WHEN g % 20 = 0 THEN 'CANCELED'
+          ELSE 'SHIPPED' END)::orderstatus,
+    created_at
+FROM (
+    SELECT g, (now() AT TIME ZONE 'utc') - make_interval(secs => g * 15) AS created_at
+    FROM generate_series(1, :orders) AS g
+) AS seed
+"""
+
+
+def compile_sql(stmt) -> str:
+    return str(
+        stmt.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def walk_plan(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+async def explain(conn: AsyncConnection, stmt) -> Dict[str, Any]:
+    transaction = await conn.begin()
+    try:
+        result = await conn.execute(
+            text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + compile_sql(stmt))
+        )
+        plan = result.scalar_one()
+    finally:
+        await transaction.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def is_orders_relation(name: Optional[str]) -> bool:
+    """orders или одна из ее партиций"""
+    return name is not None and (name == "orders" or name.startswith("orders_"))
+
+
+def scanned_rows(node: Dict[str, Any]) -> int:
+    """Строки, прочитанные узлом: отданные и отброшенные фильтром"""
+    return node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)
+
+
+def check_plan(name: str, plan: Dict[str, Any]) -> Dict[str, Any]:
+    nodes = [
+        node
+        for node in walk_plan(plan["Plan"])
+        if is_orders_relation(node.get("Relation Name")) or "Index Name" in node
+    ]
+    # Пустые партиции, созданные заранее, планировщик читает Seq Scan -
+    # это не ошибка плана, пока такой узел не прочитал ни одной строки
+    seq_scans = [
+        n for n in nodes if n["Node Type"] == "Seq Scan" and scanned_rows(n) > 0
+    ]
+    index_nodes = [n for n in nodes if n["Node Type"] in INDEX_NODES]
+    return {
+        "query": name,
+        "ok": not seq_scans and bool(index_nodes),
+        "indexes": sorted({n["Index Name"] for n in index_nodes}),
+        "partitions": sorted(
+            {
+                n["Relation Name"]
+                for n in nodes
+                if is_orders_relation(n.get("Relation Name"))
+            }
+        ),
+        "nodes": [n["Node Type"] for n in nodes],
+        "planning_ms": plan.get("Planning Time"),
+        "execution_ms": plan.get("Execution Time"),
+    }
+
+
+async def seed(conn: AsyncConnection, users: int, orders: int) -> None:
+    await conn.execute(text(SEED_USERS), {"users": users})
+    first_user = await conn.scalar(
+        text("SELECT min(id) FROM users WHERE email LIKE 'bench-%'")
+    )
+    await conn.execute(
+        text(SEED_ORDERS),
+        {"first_user": first_user, "users": users, "orders": orders},
+    )
+    await conn.commit()
+    await conn.execute(text("ANALYZE users"))
+    await conn.execute(text("ANALYZE orders"))
+    await conn.commit()
+
+
+async def build_queries(conn: AsyncConnection) -> Dict[str, Any]:
+    heavy_user = await conn.scalar(
+        text("SELECT min(id) FROM users WHERE email LIKE 'bench-%'")
+    )
+    regular_user = heavy_user + 1
+    sample = (
+        await conn.execute(
+            select(Orders.id, Orders.user_id, Orders.created_at)
+            .where(Orders.user_id == heavy_user)
+            .order_by(Orders.created_at.desc(), Orders.id.desc())
+            .offset(1000)
+            .limit(1)
+        )
+    ).one()
+    await conn.rollback()
+
+    columns = select(*Orders.__table__.c)
+    return {
+        "get_order": select(Orders).where(
+            Orders.id == sample.id,
+            *created_at_filter([sample.id]),
+            Orders.user_id == sample.user_id,
+        ),
+        "update_product": transition_statement(
+            sample.user_id, [sample.id], OrderStatus.CANCELED
+        ),
+        "get_orders_for_user:first_page": paginate(
+            columns.where(Orders.user_id == heavy_user), None, 50
+        ),
+        "get_orders_for_user:cursor_page": paginate(
+            columns.where(Orders.user_id == heavy_user),
+            encode_cursor(sample.created_at, sample.id),
+            50,
+        ),
+        "stream_orders_for_user": columns.where(Orders.user_id == regular_user)
+        .order_by(Orders.created_at.desc(), Orders.id.desc()),
+        "search_orders:sku": paginate(
+            columns.where(
+                Orders.user_id == heavy_user,
+                Orders.items.contains(literal_column("""'[{"sku": "SKU-42"}]'::jsonb""")),
+            ),
+            None,
+            50,
+        ),
+        "pending_orders_queue": select(Orders.id)
+        .where(Orders.status == OrderStatus.PENDING)
+        .order_by(Orders.created_at)
+        .limit(500),
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    engine = create_async_engine(args.database_url)
+    try:
+        async with engine.connect() as conn:
+            if not args.skip_seed:
+                await seed(conn, args.users, args.orders)
+            queries = await build_queries(conn)
+            return [
+                check_plan(name, await explain(conn, stmt))
+                for name, stmt in queries.items()
+            ]
+    finally:
+        await engine.dispose()
+
+
+def default_database_url() -> str:
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        return url
+    from app.database.db import DATABASE_URL
+
+    return DATABASE_URL
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query plans benchmark")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=2_000_000)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+    args.database_url = args.database_url or default_database_url()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if not all(item["ok"] for item in report):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Общие настройки тестов.
+
+Модули приложения создают движок БД при импорте, поэтому без DATABASE_URL
+тесты используют SQLite в памяти. Тесты, которым нужен PostgreSQL, берут
+его адрес из TEST_DATABASE_URL и пропускаются, если он не задан.
+
+Фикстура api поднимает приложение как нагрузочный прогон benchmarks.load:
+SQLite во временном файле, fakeredis вместо Redis, брокер Celery memory://,
+без ограничителей запросов.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret-key-not-for-production")
+os.environ.setdefault("CELERY_BROKER_URL", "memory://")
+os.environ.setdefault("CELERY_RESULT_BACKEND", "cache+memory://")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+
+from typing import Iterator  # noqa: E402
+
+import pytest  # noqa: E402
+
+
+class Api:
+    def __init__(self, app, session_maker, redis_client):
+        self.app = app
+        self.session_maker = session_maker
+        self.redis = redis_client
+
+    def client(self, user_id: int = 1):
+        """HTTP-клиент приложения с токеном пользователя user_id"""
+        import httpx
+
+        from app.auth.auth import create_access_token
+
+        token = create_access_token({"sub": f"user-{user_id}", "id": user_id})
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.app),
+            base_url="http://test",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+
+@pytest.fixture
+def api(tmp_path) -> Iterator[Api]:
+    """Приложение на SQLite с пользователями 1 и 2"""
+    import fakeredis.aioredis
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from app.auth import auth, register
+    from app.database.db import Base
+    from app.database.db_depends import get_db, get_user_read_db
+    from app.main import app
+    from app.models.users import Users
+    from app.orders import order
+    from app.services.local_cache import order_l1_cache
+    from app.services.rate_limiter import RateLimiter
+    from app.services.redis_service import get_redis
+
+    path = tmp_path / "orders.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    with sync_engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        conn.execute(
+            insert(Users),
+            [
+                {"id": user_id, "email": f"user-{user_id}", "password": "x"}
+                for user_id in (1, 2)
+            ],
+        )
+    sync_engine.dispose()
+
+    # Каждый тест работает в своем цикле событий: соединения не переиспользуются
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    redis_client = fakeredis.aioredis.FakeRedis()
+
+    async def test_db():
+        async with session_maker() as session:
+            yield session
+
+    async def test_redis():
+        return redis_client
+
+    async def no_rate_limit():
+        pass
+
+    app.dependency_overrides[get_db] = test_db
+    app.dependency_overrides[get_user_read_db] = test_db
+    app.dependency_overrides[order.get_current_user_read_db] = test_db
+    app.dependency_overrides[get_redis] = test_redis
+    for router in (auth.router, register.router, order.router):
+        for route in router.routes:
+            for dependency in route.dependencies:
+                if isinstance(dependency.dependency, RateLimiter):
+                    app.dependency_overrides[dependency.dependency] = no_rate_limit
+    order_l1_cache.clear()
+    try:
+        yield Api(app, session_maker, redis_client)
+    finally:
+        app.dependency_overrides.clear()
+        order_l1_cache.clear()
@@ -0,0 +1,147 @@
+"""
+In-memory Kafka stand-in - брокер, продюсер и потребитель в памяти процесса.
+
+Повторяют используемую в приложении часть API aiokafka (send, getmany,
+pause/resume, commit), чтобы BatchConsumer и код отправки событий можно было
+проверять в тестах без настоящего брокера.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from aiokafka import ConsumerRecord, TopicPartition
+from aiokafka.structs import RecordMetadata
+
+
+class InMemoryBroker:
+    def __init__(self, partitions: int = 1):
+        self.partitions = partitions
+        self.logs: Dict[TopicPartition, List[ConsumerRecord]] = defaultdict(list)
+        self.committed: Dict[str, Dict[TopicPartition, int]] = defaultdict(dict)
+        self._new_data = asyncio.Event()
+
+    def append(
+        self,
+        topic: str,
+        value: Optional[bytes],
+        key: Optional[bytes] = None,
+        partition: Optional[int] = None,
+    ) -> RecordMetadata:
+        if partition is None:
+            partition = hash(key) % self.partitions if key is not None else 0
+        tp = TopicPartition(topic, partition)
+        log = self.logs[tp]
+        offset = len(log)
+        log.append(
+            ConsumerRecord(
+                topic=topic,
+                partition=partition,
+                offset=offset,
+                timestamp=0,
+                timestamp_type=0,
+                key=key,
+                value=value,
+                checksum=None,
+                serialized_key_size=len(key) if key is not None else -1,
+                serialized_value_size=len(value) if value is not None else -1,
+                headers=(),
+            )
+        )
+        self._new_data.set()
+        return RecordMetadata(topic, partition, tp, offset, 0, 0, 0)
+
+    async def wait_for_data(self, timeout: float) -> None:
+        self._new_data.clear()
+        try:
+            await asyncio.wait_for(self._new_data.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class InMemoryProducer:
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def send(self, topic, value=None, key=None, partition=None, **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(self.broker.append(topic, value, key, partition))
+        return future
+
+    async def send_and_wait(
+        self, topic, value=None, key=None, partition=None, **kwargs
+    ):
+        return await (await self.send(topic, value, key, partition))
+
+
+class InMemoryConsumer:
+    def __init__(self, broker: InMemoryBroker, topics: Iterable[str], group_id: str):
+        self.broker = broker
+        self.group_id = group_id
+        self._assignment: Set[TopicPartition] = {
+            TopicPartition(topic, partition)
+            for topic in topics
+            for partition in range(broker.partitions)
+        }
+        self._paused: Set[TopicPartition] = set()
+        committed = broker.committed[group_id]
+        self._positions = {tp: committed.get(tp, 0) for tp in self._assignment}
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def assignment(self) -> Set[TopicPartition]:
+        return set(self._assignment)
+
+    def pause(self, *partitions: TopicPartition) -> None:
+        self._paused.update(partitions)
+
+    def resume(self, *partitions: TopicPartition) -> None:
+        self._paused.difference_update(partitions)
+
+    def paused(self) -> Set[TopicPartition]:
+        return set(self._paused)
+
+    async def committed(self, tp: TopicPartition) -> Optional[int]:
+        return self.broker.committed[self.group_id].get(tp)
+
+    async def commit(self, offsets: Optional[Dict[TopicPartition, int]] = None) -> None:
+        if offsets is None:
+            offsets = dict(self._positions)
+        self.broker.committed[self.group_id].update(offsets)
+
+    async def getmany(
+        self, *partitions: TopicPartition, timeout_ms: int = 0, max_records=None
+    ) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        batches = self._fetch(partitions, max_records)
+        if not batches and timeout_ms:
+            await self.broker.wait_for_data(timeout_ms / 1000)
+            batches = self._fetch(partitions, max_records)
+        return batches
+
+    def _fetch(
+        self, partitions, max_records
+    ) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        batches = {}
+        remaining = max_records
+        for tp in sorted(partitions or self._assignment - self._paused):
+            if remaining is not None and remaining <= 0:
+                break
+            position = self._positions[tp]
+            end = len(self.broker.logs[tp])
+            if remaining is not None:
+                end = min(end, position + remaining)
+            if end > position:
+                batches[tp] = self.broker.logs[tp][position:end]
+                self._positions[tp] = end
+                if remaining is not None:
+                    remaining -= end - position
+        return batches
@@ -0,0 +1,9 @@
+import asyncio
+
+
+def test_debug_routes_are_not_mounted_by_default(api):
+    async def scenario():
+        async with api.client() as client:
+            return await client.get("/debug/cache")
+
+    assert asyncio.run(scenario()).status_code == 404
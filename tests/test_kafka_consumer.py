@@ -0,0 +1,166 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+from aiokafka import ConsumerRecord, TopicPartition
+
+from app.consumers.kafka_consumer import BatchConsumer
+from tests.in_memory_kafka import InMemoryBroker, InMemoryConsumer
+
+TOPIC = "new_orders"
+GROUP = "order-consumers"
+
+
+def _fill(broker: InMemoryBroker, records_per_partition: int) -> None:
+    for partition in range(broker.partitions):
+        for index in range(records_per_partition):
+            broker.append(TOPIC, f"{partition}:{index}".encode(), partition=partition)
+
+
+async def _run(batch_consumer: BatchConsumer) -> None:
+    await asyncio.wait_for(batch_consumer.run(), timeout=5)
+
+
+def test_commits_offsets_after_batches_are_handled():
+    async def scenario() -> Dict[TopicPartition, List[int]]:
+        broker = InMemoryBroker(partitions=2)
+        _fill(broker, 10)
+        handled: Dict[TopicPartition, List[int]] = {}
+
+        async def handler(tp: TopicPartition, records: List[ConsumerRecord]) -> None:
+            handled.setdefault(tp, []).extend(record.offset for record in records)
+            if sum(map(len, handled.values())) == 20:
+                batch_consumer.stop()
+
+        batch_consumer = BatchConsumer(
+            InMemoryConsumer(broker, [TOPIC], GROUP),
+            handler,
+            max_records=3,
+            timeout_ms=10,
+            max_retries=0,
+        )
+        await _run(batch_consumer)
+        assert broker.committed[GROUP] == {
+            TopicPartition(TOPIC, 0): 10,
+            TopicPartition(TOPIC, 1): 10,
+        }
+        return handled
+
+    handled = asyncio.run(scenario())
+    # Внутри партиции пачки обрабатываются по порядку
+    for offsets in handled.values():
+        assert offsets == list(range(10))
+
+
+def test_failed_batch_does_not_commit_its_partition():
+    async def scenario() -> InMemoryBroker:
+        broker = InMemoryBroker(partitions=2)
+        _fill(broker, 10)
+        first_partition_done = asyncio.Event()
+
+        async def handler(tp: TopicPartition, records: List[ConsumerRecord]) -> None:
+            if tp.partition == 0:
+                if records[-1].offset == 9:
+                    first_partition_done.set()
+                return
+            if records[0].offset == 5:
+                await first_partition_done.wait()
+                raise RuntimeError("handler failed")
+
+        batch_consumer = BatchConsumer(
+            InMemoryConsumer(broker, [TOPIC], GROUP),
+            handler,
+            max_records=5,
+            timeout_ms=10,
+            concurrency=2,
+            max_retries=1,
+        )
+        with pytest.raises(RuntimeError, match="handler failed"):
+            await _run(batch_consumer)
+        return broker
+
+    broker = asyncio.run(scenario())
+    # Упавшая пачка 5..9 не закоммичена и будет прочитана повторно;
+    # пачки, обработанные до нее, и другая партиция закоммичены
+    assert broker.committed[GROUP] == {
+        TopicPartition(TOPIC, 0): 10,
+        TopicPartition(TOPIC, 1): 5,
+    }
+
+
+def test_uncommitted_batch_is_consumed_again_after_restart():
+    async def scenario() -> List[int]:
+        broker = InMemoryBroker(partitions=1)
+        _fill(broker, 4)
+
+        async def failing(tp: TopicPartition, records: List[ConsumerRecord]) -> None:
+            raise RuntimeError("handler failed")
+
+        with pytest.raises(RuntimeError):
+            await _run(
+                BatchConsumer(
+                    InMemoryConsumer(broker, [TOPIC], GROUP),
+                    failing,
+                    timeout_ms=10,
+                    max_retries=0,
+                )
+            )
+
+        handled: List[int] = []
+
+        async def handler(tp: TopicPartition, records: List[ConsumerRecord]) -> None:
+            handled.extend(record.offset for record in records)
+            if len(handled) == 4:
+                batch_consumer.stop()
+
+        batch_consumer = BatchConsumer(
+            InMemoryConsumer(broker, [TOPIC], GROUP),
+            handler,
+            timeout_ms=10,
+            max_retries=0,
+        )
+        await _run(batch_consumer)
+        assert broker.committed[GROUP] == {TopicPartition(TOPIC, 0): 4}
+        return handled
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3]
+
+
+def test_slow_partition_is_paused_while_others_are_consumed():
+    async def scenario():
+        broker = InMemoryBroker(partitions=2)
+        _fill(broker, 5)
+        consumer = InMemoryConsumer(broker, [TOPIC], GROUP)
+        slow, fast = TopicPartition(TOPIC, 0), TopicPartition(TOPIC, 1)
+        unblock = asyncio.Event()
+        handled: List[TopicPartition] = []
+        slow_paused: List[bool] = []
+
+        async def handler(tp: TopicPartition, records: List[ConsumerRecord]) -> None:
+            if tp == slow:
+                await unblock.wait()
+            handled.extend(tp for _ in records)
+            if handled.count(fast) == 5 and not unblock.is_set():
+                slow_paused.append(slow in consumer.paused())
+                unblock.set()
+            if len(handled) == 10:
+                batch_consumer.stop()
+
+        batch_consumer = BatchConsumer(
+            consumer,
+            handler,
+            max_records=1,
+            timeout_ms=10,
+            concurrency=2,
+            max_pending_batches=1,
+            max_retries=0,
+        )
+        await _run(batch_consumer)
+        return slow, fast, handled, slow_paused, consumer.paused(), broker
+
+    slow, fast, handled, slow_paused, paused, broker = asyncio.run(scenario())
+    # Медленная партиция стоит на паузе, а быстрая за это время прочитана целиком
+    assert handled[:5] == [fast] * 5
+    assert slow_paused == [True]
+    assert paused == set()
+    assert broker.committed[GROUP] == {slow: 5, fast: 5}
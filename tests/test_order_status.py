@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List
+from uuid import UUID
+
+from app.models.orders import OrderStatus
+from app.orders.crud import transition_orders
+from app.orders.ids import new_order_id
+
+
+async def _create(client, statuses: List[str], price: float = 10.0) -> List[str]:
+    response = await client.post(
+        "/orders/batch",
+        json=[
+            {"items": [{"sku": "SKU-1"}], "total_price": price, "status": status}
+            for status in statuses
+        ],
+    )
+    assert response.status_code == 207
+    return [result["id"] for result in response.json()["results"]]
+
+
+async def _stats(client, user_id: int = 1) -> Dict[str, Any]:
+    response = await client.get(f"/orders/user/{user_id}/stats")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_transition_orders_returns_previous_status(api):
+    async def scenario():
+        async with api.client() as client:
+            paid, shipped = await _create(client, ["PAID", "SHIPPED"])
+        async with api.session_maker() as session:
+            rows = await transition_orders(
+                session, 1, [UUID(paid), UUID(shipped)], OrderStatus.CANCELED
+            )
+            await session.commit()
+        async with api.client() as client:
+            return paid, rows, await _stats(client)
+
+    paid, rows, stats = asyncio.run(scenario())
+    # SHIPPED -> CANCELED запрещен, строка не меняется
+    assert [str(row.id) for row in rows] == [paid]
+    assert rows[0].status == OrderStatus.CANCELED
+    assert rows[0].previous_status == OrderStatus.PAID
+    assert rows[0].version == 2
+    assert stats["paid_count"] == 0
+    assert stats["shipped_count"] == 1
+    assert stats["canceled_count"] == 1
+    assert stats["total_spent"] == 10.0
+
+
+def test_update_order_status(api):
+    async def scenario():
+        async with api.client() as client:
+            (order_id,) = await _create(client, ["PENDING"])
+            paid = await client.put(f"/orders/{order_id}", json={"status": "PAID"})
+            fetched = await client.get(f"/orders/{order_id}")
+            back = await client.put(f"/orders/{order_id}", json={"status": "PENDING"})
+            stats = await _stats(client)
+        async with api.client(user_id=2) as client:
+            foreign = await client.put(
+                f"/orders/{order_id}", json={"status": "CANCELED"}
+            )
+        return paid, fetched, back, stats, foreign
+
+    paid, fetched, back, stats, foreign = asyncio.run(scenario())
+    assert paid.status_code == 200
+    assert fetched.json()["status"] == "PAID"
+    assert fetched.json()["version"] == 2
+    assert back.status_code == 409
+    assert back.json()["detail"] == "Cannot change order status from PAID to PENDING"
+    assert stats["pending_count"] == 0 and stats["paid_count"] == 1
+    assert foreign.status_code == 404
+
+
+def test_bulk_update_status_reports_each_order(api):
+    missing = str(new_order_id(datetime.utcnow()))
+
+    async def scenario():
+        async with api.client(user_id=2) as client:
+            (foreign,) = await _create(client, ["PENDING"])
+        async with api.client() as client:
+            pending, shipped = await _create(client, ["PENDING", "SHIPPED"], 5.0)
+            response = await client.put(
+                "/orders/status",
+                json={
+                    "order_ids": [pending, shipped, missing, foreign, pending],
+                    "status": "CANCELED",
+                },
+            )
+            stats = await _stats(client)
+        async with api.client(user_id=2) as client:
+            foreign_order = await client.get(f"/orders/{foreign}")
+        return pending, shipped, foreign, response, stats, foreign_order
+
+    pending, shipped, foreign, response, stats, foreign_order = asyncio.run(
+        scenario()
+    )
+    assert response.status_code == 207
+    assert response.json() == {
+        "updated": 1,
+        "failed": 3,
+        "results": [
+            {"id": pending, "status": "updated"},
+            {
+                "id": shipped,
+                "status": "invalid_transition",
+                "current_status": "SHIPPED",
+            },
+            {"id": missing, "status": "not_found"},
+            {"id": foreign, "status": "not_found"},
+        ],
+    }
+    assert stats["pending_count"] == 0
+    assert stats["canceled_count"] == 1
+    assert stats["total_spent"] == 5.0
+    assert foreign_order.json()["status"] == "PENDING"
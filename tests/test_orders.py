@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import insert, select
+
+from app.models.orders import OrderStatus, Orders
+from app.orders import order
+from app.orders.ids import new_order_id
+
+ORDER = {"items": [{"sku": "SKU-1", "qty": 1}], "total_price": 10.0}
+
+
+def _record_delay(monkeypatch, task) -> List[Any]:
+    calls: List[Any] = []
+    monkeypatch.setattr(task, "delay", lambda *args: calls.append(args))
+    return calls
+
+
+async def _orders(api) -> List[Orders]:
+    async with api.session_maker() as session:
+        return list((await session.scalars(select(Orders))).all())
+
+
+def test_new_orders_stay_pending_without_auto_pay(api, monkeypatch):
+    monkeypatch.setattr(order.settings, "ORDER_AUTO_PAY_ENABLED", False)
+    single = _record_delay(monkeypatch, order.process_order)
+    batch = _record_delay(monkeypatch, order.process_orders_batch)
+
+    async def scenario() -> Dict[str, Any]:
+        async with api.client() as client:
+            created = await client.post("/orders/", json=ORDER)
+            assert created.status_code == 201
+            response = await client.post("/orders/batch", json=[ORDER, ORDER])
+            assert response.status_code == 207
+            fetched = await client.get(f"/orders/{created.json()['id']}")
+            assert fetched.status_code == 200
+        return fetched.json()
+
+    assert asyncio.run(scenario())["status"] == OrderStatus.PENDING.value
+    assert single == [] and batch == []
+    statuses = [row.status for row in asyncio.run(_orders(api))]
+    assert statuses == [OrderStatus.PENDING] * 3
+
+
+def test_auto_pay_enqueues_new_orders(api, monkeypatch):
+    monkeypatch.setattr(order.settings, "ORDER_AUTO_PAY_ENABLED", True)
+    single = _record_delay(monkeypatch, order.process_order)
+
+    async def scenario() -> str:
+        async with api.client() as client:
+            response = await client.post("/orders/", json=ORDER)
+            assert response.status_code == 201
+        return response.json()["id"]
+
+    order_id = asyncio.run(scenario())
+    assert single == [(order_id,)]
+
+
+def test_enqueue_failure_keeps_idempotent_create(api, monkeypatch):
+    monkeypatch.setattr(order.settings, "ORDER_AUTO_PAY_ENABLED", True)
+
+    def broker_down(*args):
+        raise ConnectionError("broker is down")
+
+    monkeypatch.setattr(order.process_order, "delay", broker_down)
+    headers = {"Idempotency-Key": "create-1"}
+
+    async def scenario():
+        async with api.client() as client:
+            first = await client.post("/orders/", json=ORDER, headers=headers)
+            second = await client.post("/orders/", json=ORDER, headers=headers)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+    assert second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+    rows = asyncio.run(_orders(api))
+    assert [str(row.id) for row in rows] == [first.json()["id"]]
+
+
+def test_search_converts_aware_dates_to_utc(api):
+    moments = [datetime(2026, 10, 18, hour) for hour in (9, 10, 11)]
+
+    async def scenario():
+        async with api.session_maker() as session:
+            await session.execute(
+                insert(Orders),
+                [
+                    {
+                        "id": new_order_id(created_at),
+                        "user_id": 1,
+                        "items": [{"sku": "SKU-1"}],
+                        "total_price": 10.0,
+                        "status": OrderStatus.PENDING,
+                        "created_at": created_at,
+                    }
+                    for created_at in moments
+                ],
+            )
+            await session.commit()
+        async with api.client() as client:
+            return await client.get(
+                "/orders/search",
+                params={
+                    "created_from": "2026-10-18T12:30:00+03:00",
+                    "created_to": "2026-10-18T11:00:00Z",
+                },
+            )
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    found = [row["created_at"] for row in response.json()["orders"]]
+    assert found == ["2026-10-18T10:00:00"]
@@ -0,0 +1,170 @@
+import csv
+import gzip
+import io
+import os
+from datetime import datetime
+from typing import Iterator, List
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import Engine, create_engine, func, insert, select, text
+
+from app.database.db import Base, sync_database_url
+from app.database.partitions import (
+    Partition,
+    archive_partitions,
+    ensure_partitions,
+    list_partitions,
+)
+from app.models.orders import OrderStatus, Orders
+from app.models.users import Users
+from app.orders.ids import new_order_id
+
+NOW = datetime(2026, 10, 18, 12, 30)
+
+
+@pytest.fixture
+def pg_engine() -> Iterator[Engine]:
+    """Движок PostgreSQL со своей схемой, в которой orders еще без партиций"""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    url = sync_database_url(url)
+    schema = f"test_partitions_{uuid4().hex[:8]}"
+    admin = create_engine(url)
+    with admin.begin() as conn:
+        conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    engine = create_engine(url, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        with engine.begin() as conn:
+            Base.metadata.create_all(conn)
+            conn.execute(insert(Users).values(id=1, email="user", password="x"))
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        admin.dispose()
+
+
+def _insert_orders(engine: Engine, moments: List[datetime]) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Orders),
+            [
+                {
+                    "id": new_order_id(created_at),
+                    "user_id": 1,
+                    "items": [{"sku": "SKU-1"}],
+                    "total_price": 10.0,
+                    "status": OrderStatus.PENDING,
+                    "created_at": created_at,
+                }
+                for created_at in moments
+            ],
+        )
+
+
+def _partitions(engine: Engine) -> List[Partition]:
+    with engine.connect() as conn:
+        return list_partitions(conn)
+
+
+def test_ensure_partitions_is_noop_without_postgres():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        assert ensure_partitions(conn, months_ahead=3, now=NOW) == []
+
+
+def test_ensure_partitions_creates_current_and_future_months(pg_engine):
+    with pg_engine.begin() as conn:
+        created = ensure_partitions(conn, months_ahead=2, now=NOW)
+    assert created == ["orders_p2026_10", "orders_p2026_11", "orders_p2026_12"]
+    assert _partitions(pg_engine) == [
+        Partition("orders_p2026_10", datetime(2026, 10, 1), datetime(2026, 11, 1)),
+        Partition("orders_p2026_11", datetime(2026, 11, 1), datetime(2026, 12, 1)),
+        Partition("orders_p2026_12", datetime(2026, 12, 1), datetime(2027, 1, 1)),
+    ]
+
+    # Повторный запуск ничего не создает
+    with pg_engine.begin() as conn:
+        assert ensure_partitions(conn, months_ahead=2, now=NOW) == []
+
+    _insert_orders(pg_engine, [datetime(2026, 11, 5)])
+    with pg_engine.connect() as conn:
+        assert conn.scalar(text("SELECT count(*) FROM orders_p2026_11")) == 1
+
+
+def test_ensure_partitions_skips_months_covered_by_legacy(pg_engine):
+    with pg_engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE orders_legacy PARTITION OF orders "
+                "FOR VALUES FROM (MINVALUE) TO ('2026-12-01')"
+            )
+        )
+        created = ensure_partitions(conn, months_ahead=3, now=NOW)
+    assert created == ["orders_p2026_12", "orders_p2027_01"]
+    assert _partitions(pg_engine)[0] == Partition(
+        "orders_legacy", None, datetime(2026, 12, 1)
+    )
+
+
+def test_archive_partitions_exports_and_drops_old_months(pg_engine, tmp_path):
+    with pg_engine.begin() as conn:
+        ensure_partitions(conn, months_ahead=14, now=datetime(2025, 8, 1))
+    _insert_orders(
+        pg_engine,
+        [
+            datetime(2025, 8, 3),
+            datetime(2025, 8, 20),
+            datetime(2025, 9, 9),
+            datetime(2025, 10, 1),
+            datetime(2026, 10, 2),
+        ],
+    )
+
+    archived = archive_partitions(
+        pg_engine, older_than_months=12, output_dir=str(tmp_path), now=NOW
+    )
+
+    assert archived == [
+        str(tmp_path / "orders_p2025_08.csv.gz"),
+        str(tmp_path / "orders_p2025_09.csv.gz"),
+    ]
+    with gzip.open(archived[0], "rt") as archive:
+        rows = list(csv.DictReader(io.StringIO(archive.read())))
+    assert [row["created_at"] for row in rows] == [
+        "2025-08-03 00:00:00",
+        "2025-08-20 00:00:00",
+    ]
+    assert not list(tmp_path.glob("*.tmp"))
+
+    names = [partition.name for partition in _partitions(pg_engine)]
+    assert names[0] == "orders_p2025_10"
+    with pg_engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Orders)) == 2
+        assert conn.scalar(text("SELECT to_regclass('orders_p2025_08')")) is None
+
+
+def test_archive_partitions_keep_leaves_detached_table(pg_engine, tmp_path):
+    with pg_engine.begin() as conn:
+        ensure_partitions(conn, months_ahead=1, now=datetime(2025, 1, 1))
+    _insert_orders(pg_engine, [datetime(2025, 1, 15)])
+
+    archived = archive_partitions(
+        pg_engine,
+        older_than_months=12,
+        output_dir=str(tmp_path),
+        keep=True,
+        now=NOW,
+    )
+
+    assert archived == [
+        str(tmp_path / "orders_p2025_01.csv.gz"),
+        str(tmp_path / "orders_p2025_02.csv.gz"),
+    ]
+    assert _partitions(pg_engine) == []
+    with pg_engine.connect() as conn:
+        assert conn.scalar(text("SELECT count(*) FROM orders_p2025_01")) == 1
+        assert conn.scalar(select(func.count()).select_from(Orders)) == 0